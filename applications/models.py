@@ -1,5 +1,6 @@
 from django.db import models
-from companies.models import Company, SoftDeleteManager
+from django.utils import timezone
+from companies.models import Company, SoftDeleteManager, SoftDeleteQuerySet
 
 
 class Application(models.Model):
@@ -20,14 +21,23 @@ class Application(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    # 論理削除・復元をまとめて行う関連モデル
+    soft_delete_cascade = [
+        ('manuals.Manual', 'application'),
+    ]
+
+    # 一覧画面の検索対象（terao_navi_web.search、FULLTEXTインデックスはensure_fulltext_indexesで作成）
+    search_fields = ('application_name', 'description')
 
     class Meta:
         db_table = 'applications'
         verbose_name = 'アプリケーション'
         verbose_name_plural = 'アプリケーション'
         indexes = [
-            models.Index(fields=['company']),
+            # 会社ごとの一覧（論理削除を除外し、作成日時の降順でキーセットページネーション）
+            models.Index(fields=['company', 'is_deleted', 'created_at', 'application_id']),
             models.Index(fields=['application_name']),
         ]
 
@@ -35,14 +45,17 @@ class Application(models.Model):
         return f"{self.application_name} ({self.company.name})"
 
     def delete(self, using=None, keep_parents=False):
-        """論理削除（紐づくマニュアルも削除）"""
-        from django.utils import timezone
-        
-        # 紐づくマニュアルも論理削除
-        for manual in self.manuals.filter(is_deleted=False):
-            manual.delete()
-        
-        # アプリケーション自体を論理削除
+        """論理削除（紐づくマニュアルもまとめて削除）"""
+        now = timezone.now()
+        Application.all_objects.filter(pk=self.pk).soft_delete(now)
         self.is_deleted = True
-        self.deleted_at = timezone.now()
-        self.save()
+        self.deleted_at = now
+        self.updated_at = now
+
+    def restore(self):
+        """削除を取り消す（アプリケーションの削除時にまとめて削除されたマニュアルも復元）"""
+        now = timezone.now()
+        Application.all_objects.filter(pk=self.pk).restore(now)
+        self.is_deleted = False
+        self.deleted_at = None
+        self.updated_at = now
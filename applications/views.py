@@ -1,9 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
 from .models import Application
 from .forms import ApplicationForm
 from companies.models import Company
+from users.middleware import get_current_user
+from terao_navi_web.search import paginate_search
 
 
 def require_user_authentication(view_func):
@@ -16,18 +17,6 @@ def require_user_authentication(view_func):
     return wrapper
 
 
-def get_current_user(request):
-    """セッションから現在のユーザーを取得"""
-    from users.models import User
-    user_id = request.session.get('user_id')
-    if user_id:
-        try:
-            return User.objects.get(user_id=user_id, is_active=True)
-        except User.DoesNotExist:
-            return None
-    return None
-
-
 @require_user_authentication
 def application_list(request):
     """アプリケーション一覧（同一company_id内のみ）"""
@@ -39,14 +28,10 @@ def application_list(request):
     query = request.GET.get('q', '')
     applications = Application.objects.filter(company_id=current_user.company_id).select_related('company')
     
-    if query:
-        applications = applications.filter(
-            Q(application_name__icontains=query) |
-            Q(description__icontains=query)
-        )
-    
+    page = paginate_search(request, applications, query)
     context = {
-        'applications': applications.order_by('-created_at'),
+        'applications': page.object_list,
+        'page': page,
         'query': query,
         'current_user': current_user,
     }
@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.urls import reverse
 from django.utils.html import format_html
 from .models import Company
 
@@ -40,12 +41,20 @@ class CompanyAdmin(admin.ModelAdmin):
     is_deleted_display.short_description = '状態'
 
     def restore_items(self, request, queryset):
-        """選択したアイテムを復元"""
-        count = 0
-        for item in queryset:
-            if item.is_deleted:
-                item.restore()
-                count += 1
+        """選択したアイテムをまとめて復元"""
+        company_ids = list(queryset.filter(is_deleted=True).values_list('company_id', flat=True))
+        count = queryset.restore()
         self.message_user(request, f'{count}件の会社を復元しました。')
+        # 削除時にDynamoDBのクライアント認証情報は削除されているため、再発行が必要
+        for company_id in company_ids:
+            self.message_user(
+                request,
+                format_html(
+                    '会社ID {} のクライアント認証情報は復元されません。<a href="{}">会社詳細</a>から再発行してください。',
+                    company_id,
+                    reverse('company_detail', args=[company_id]),
+                ),
+                level=messages.WARNING,
+            )
     restore_items.short_description = '選択した会社を復元'
 
@@ -1,21 +1,167 @@
+import os
+import threading
+import time
 import boto3
 import secrets
 import hashlib
-from datetime import datetime
+import hmac
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from botocore.config import Config
 from django.conf import settings
 
 
-def get_dynamodb_client():
-    """DynamoDBクライアントを取得"""
-    return boto3.client(
+# プロセス内で共有するDynamoDBリソース（クライアントはリソースのものを使う）
+_dynamodb_resource = None
+_dynamodb_pid = None
+_dynamodb_lock = threading.Lock()
+
+# BatchWriteItemの1リクエストあたりの上限件数
+BATCH_WRITE_SIZE = 25
+
+
+class CredentialsCache:
+    """
+    クライアント認証結果のLRU+TTLキャッシュ（プロセス内）
+
+    client_idごとにシークレットハッシュと認証結果を保持する。存在しない・無効な
+    client_idも短時間キャッシュし、不正な認証情報でDynamoDBへ問い合わせが集中しないようにする。
+    無効化・削除は同じプロセス内では即時に反映され、他プロセスではTTL経過後に反映される。
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, client_id):
+        """
+        キャッシュを参照
+
+        Returns:
+            tuple or None: (secret_hash, client) 未キャッシュ時None（無効なclient_idは (None, None)）
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[client_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(client_id)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, client_id, secret_hash, client):
+        """認証結果を登録（clientがNoneの場合は無効なclient_idとして短時間のみ保持）"""
+        max_size = settings.AUTH_CLIENT_CACHE_SIZE
+        if max_size <= 0:
+            return
+        ttl = settings.AUTH_CLIENT_CACHE_TTL if client is not None else settings.AUTH_CLIENT_NEGATIVE_CACHE_TTL
+        with self._lock:
+            self._entries[client_id] = (time.monotonic() + ttl, secret_hash, client)
+            self._entries.move_to_end(client_id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, client_ids):
+        """指定したクライアントのキャッシュを破棄"""
+        with self._lock:
+            for client_id in client_ids:
+                self._entries.pop(client_id, None)
+
+    def clear(self):
+        """キャッシュと統計を破棄"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ヒット・ミス回数とキャッシュ件数を取得"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+# クライアント認証結果のキャッシュ
+_credentials_cache = CredentialsCache()
+
+
+def get_credentials_cache_stats():
+    """
+    クライアント認証キャッシュの統計を取得
+    
+    Returns:
+        dict: hits, misses, size
+    """
+    return _credentials_cache.stats()
+
+
+def clear_credentials_cache():
+    """クライアント認証キャッシュを破棄（テスト・計測用）"""
+    _credentials_cache.clear()
+
+
+def _build_dynamodb_resource():
+    """DynamoDBリソースを新規に生成（接続プール・リトライ・タイムアウトは設定値から取得）"""
+    session = boto3.session.Session()
+    return session.resource(
         'dynamodb',
         endpoint_url=settings.DYNAMODB_ENDPOINT_URL,
         region_name=settings.DYNAMODB_REGION_NAME,
         aws_access_key_id=settings.DYNAMODB_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.DYNAMODB_SECRET_ACCESS_KEY
+        aws_secret_access_key=settings.DYNAMODB_SECRET_ACCESS_KEY,
+        config=Config(
+            max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+            tcp_keepalive=True,
+            retries={
+                'mode': settings.DYNAMODB_RETRY_MODE,
+                'max_attempts': settings.DYNAMODB_MAX_ATTEMPTS,
+            },
+        ),
     )
 
 
+def _get_dynamodb_resource():
+    """
+    共有DynamoDBリソースを取得
+
+    初回呼び出し時にのみ生成し、fork後の子プロセスでは作り直す。
+    """
+    global _dynamodb_resource, _dynamodb_pid
+
+    pid = os.getpid()
+    if _dynamodb_resource is None or _dynamodb_pid != pid:
+        with _dynamodb_lock:
+            if _dynamodb_resource is None or _dynamodb_pid != pid:
+                _dynamodb_resource = _build_dynamodb_resource()
+                _dynamodb_pid = pid
+    return _dynamodb_resource
+
+
+def get_dynamodb_client():
+    """DynamoDBクライアントを取得（プロセス内で共有）"""
+    return _get_dynamodb_resource().meta.client
+
+
+def get_table_name(name):
+    """プレフィックス付きのテーブル名を取得"""
+    return f"{settings.DYNAMODB_TABLE_PREFIX}{name}"
+
+
+def reset_dynamodb_client():
+    """共有クライアントを破棄（設定変更時やテスト用）"""
+    global _dynamodb_resource, _dynamodb_pid
+    with _dynamodb_lock:
+        _dynamodb_resource = None
+        _dynamodb_pid = None
+
+
 def generate_client_credentials():
     """
     クライアントIDとシークレットを生成
@@ -35,6 +181,52 @@ def generate_client_credentials():
     return client_id, client_secret, secret_hash
 
 
+def build_auth_client_item(company_id, client_id, secret_hash, issued_at=None):
+    """
+    auth_clientsテーブルに登録するアイテムを生成
+    
+    Args:
+        company_id: 会社ID
+        client_id: クライアントID
+        secret_hash: シークレットのハッシュ値
+        issued_at: 管理画面で発行した日時（ISO 8601、マイクロ秒まで）。失効の判定に使う
+        
+    Returns:
+        dict: DynamoDBのアイテム
+    """
+    # 現在時刻をISO 8601形式で取得
+    created_at = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    item = {
+        'client_id': {'S': client_id},
+        'company_id': {'N': str(company_id)},
+        'secret_hash': {'S': secret_hash},
+        'is_active': {'N': '1'},
+        'created_at': {'S': created_at}
+    }
+    if issued_at:
+        item['issued_at'] = {'S': issued_at}
+    return item
+
+
+def get_issued_at(item):
+    """
+    クライアントの発行日時を取得
+
+    issued_atがない過去のアイテムは登録日時（created_at、秒単位のUTC）を発行日時とする。
+
+    Returns:
+        datetime or None: タイムゾーン付きの発行日時
+    """
+    value = item.get('issued_at', item.get('created_at', {})).get('S')
+    if not value:
+        return None
+    issued_at = datetime.fromisoformat(value)
+    if issued_at.tzinfo is None:
+        issued_at = issued_at.replace(tzinfo=timezone.utc)
+    return issued_at
+
+
 def create_auth_client(company_id, client_id, secret_hash):
     """
     DynamoDBのauth_clientsテーブルにクライアント情報を登録
@@ -49,22 +241,14 @@ def create_auth_client(company_id, client_id, secret_hash):
     """
     try:
         dynamodb = get_dynamodb_client()
-        table_name = f"{settings.DYNAMODB_TABLE_PREFIX}auth_clients"
-        
-        # 現在時刻をISO 8601形式で取得
-        created_at = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        table_name = get_table_name('auth_clients')
         
         # DynamoDBに登録
         dynamodb.put_item(
             TableName=table_name,
-            Item={
-                'client_id': {'S': client_id},
-                'company_id': {'N': str(company_id)},
-                'secret_hash': {'S': secret_hash},
-                'is_active': {'N': '1'},
-                'created_at': {'S': created_at}
-            }
+            Item=build_auth_client_item(company_id, client_id, secret_hash)
         )
+        _credentials_cache.invalidate([client_id])
         
         return True
     except Exception as e:
@@ -72,10 +256,53 @@ def create_auth_client(company_id, client_id, secret_hash):
         return False
 
 
+def create_auth_clients(clients):
+    """
+    クライアント情報をまとめて登録（BatchWriteItem）
+    
+    Args:
+        clients: (company_id, client_id, secret_hash) または
+                 (company_id, client_id, secret_hash, issued_at) のリスト
+        
+    Returns:
+        int: 登録件数
+    """
+    try:
+        return batch_write_items(get_table_name('auth_clients'), [
+            {'PutRequest': {'Item': build_auth_client_item(*client)}}
+            for client in clients
+        ])
+    finally:
+        _credentials_cache.invalidate([client[1] for client in clients])
+
+
+def get_company_ids_with_clients():
+    """
+    クライアントが登録済みの会社IDを取得（並列Scan）
+    
+    Returns:
+        set: 会社IDの集合
+    """
+    items = parallel_scan({
+        'TableName': get_table_name('auth_clients'),
+        'ProjectionExpression': 'company_id',
+    })
+    company_ids = set()
+    for item in items:
+        value = item.get('company_id', {})
+        # 型が文字列の過去データ（型ぶれ）も対象にする
+        raw = value.get('N', value.get('S'))
+        if raw is not None and raw.isdigit():
+            company_ids.add(int(raw))
+    return company_ids
+
+
 def verify_client_credentials(client_id, client_secret):
     """
     クライアント認証情報を検証
     
+    検証結果はTTL付きでキャッシュし、キャッシュにない場合のみDynamoDBから取得する。
+    
     Args:
         client_id: クライアントID
         client_secret: クライアントシークレット
@@ -84,43 +311,69 @@ def verify_client_credentials(client_id, client_secret):
         dict or None: 認証成功時にクライアント情報を返す、失敗時None
     """
     try:
-        dynamodb = get_dynamodb_client()
-        table_name = f"{settings.DYNAMODB_TABLE_PREFIX}auth_clients"
-        
-        # クライアント情報を取得
-        response = dynamodb.get_item(
-            TableName=table_name,
-            Key={'client_id': {'S': client_id}}
-        )
-        
-        if 'Item' not in response:
-            return None
-        
-        item = response['Item']
-        
-        # アクティブチェック
-        if item.get('is_active', {}).get('N') != '1':
+        secret_hash = hashlib.sha256(client_secret.encode()).hexdigest()
+
+        cached = _credentials_cache.get(client_id)
+        if cached is None:
+            stored_hash, client = fetch_auth_client(client_id)
+            _credentials_cache.set(client_id, stored_hash, client)
+        else:
+            stored_hash, client = cached
+
+        # 存在しない・無効なクライアント
+        if client is None:
             return None
         
         # シークレットハッシュを検証
-        secret_hash = hashlib.sha256(client_secret.encode()).hexdigest()
-        stored_hash = item.get('secret_hash', {}).get('S')
-        
-        if secret_hash != stored_hash:
+        if not hmac.compare_digest(secret_hash, stored_hash):
             return None
         
-        # クライアント情報を返す
-        return {
-            'client_id': item['client_id']['S'],
-            'company_id': int(item['company_id']['N']),
-            'is_active': int(item['is_active']['N']),
-            'created_at': item['created_at']['S']
-        }
+        return dict(client)
     except Exception as e:
         print(f"Error verifying client credentials: {e}")
         return None
 
 
+def fetch_auth_client(client_id):
+    """
+    DynamoDBからクライアント情報を取得
+    
+    Args:
+        client_id: クライアントID
+        
+    Returns:
+        tuple: (secret_hash, クライアント情報) 存在しない・無効な場合は (None, None)
+    """
+    dynamodb = get_dynamodb_client()
+    table_name = get_table_name('auth_clients')
+    
+    # クライアント情報を取得
+    response = dynamodb.get_item(
+        TableName=table_name,
+        Key={'client_id': {'S': client_id}}
+    )
+    
+    if 'Item' not in response:
+        return None, None
+    
+    item = response['Item']
+    
+    # アクティブチェック
+    if item.get('is_active', {}).get('N') != '1':
+        return None, None
+    
+    stored_hash = item.get('secret_hash', {}).get('S')
+    if not stored_hash:
+        return None, None
+    
+    return stored_hash, {
+        'client_id': item['client_id']['S'],
+        'company_id': int(item['company_id']['N']),
+        'is_active': int(item['is_active']['N']),
+        'created_at': item['created_at']['S']
+    }
+
+
 def get_client_by_company_id(company_id):
     """
     会社IDからクライアント情報を取得
@@ -133,7 +386,7 @@ def get_client_by_company_id(company_id):
     """
     try:
         dynamodb = get_dynamodb_client()
-        table_name = f"{settings.DYNAMODB_TABLE_PREFIX}auth_clients"
+        table_name = get_table_name('auth_clients')
         
         response = dynamodb.query(
             TableName=table_name,
@@ -171,7 +424,7 @@ def deactivate_client(client_id):
     """
     try:
         dynamodb = get_dynamodb_client()
-        table_name = f"{settings.DYNAMODB_TABLE_PREFIX}auth_clients"
+        table_name = get_table_name('auth_clients')
         
         dynamodb.update_item(
             TableName=table_name,
@@ -181,6 +434,7 @@ def deactivate_client(client_id):
                 ':inactive': {'N': '0'}
             }
         )
+        _credentials_cache.invalidate([client_id])
         
         return True
     except Exception as e:
@@ -188,10 +442,165 @@ def deactivate_client(client_id):
         return False
 
 
+def _write_batch(table_name, batch):
+    """25件以内の書き込み・削除を実行（未処理分は指数バックオフで再試行）"""
+    dynamodb = get_dynamodb_client()
+    pending = batch
+    attempt = 0
+    while pending:
+        response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+        pending = response.get('UnprocessedItems', {}).get(table_name, [])
+        if pending:
+            attempt += 1
+            if attempt > settings.DYNAMODB_BATCH_MAX_RETRIES:
+                raise RuntimeError(f"{len(pending)} items were not processed in {table_name}")
+            time.sleep(min(0.05 * (2 ** attempt), 2.0))
+    return len(batch)
+
+
+def batch_write_items(table_name, requests):
+    """
+    BatchWriteItemで書き込み・削除をまとめて実行（25件単位のバッチを並列に送信）
+    
+    Args:
+        table_name: テーブル名
+        requests: PutRequest / DeleteRequest のリスト
+        
+    Returns:
+        int: 処理した件数
+    """
+    batches = [requests[start:start + BATCH_WRITE_SIZE] for start in range(0, len(requests), BATCH_WRITE_SIZE)]
+    if len(batches) <= 1:
+        return sum(_write_batch(table_name, batch) for batch in batches)
+
+    with ThreadPoolExecutor(max_workers=min(settings.DYNAMODB_BATCH_WRITE_WORKERS, len(batches))) as executor:
+        return sum(executor.map(lambda batch: _write_batch(table_name, batch), batches))
+
+
+def parallel_scan(params, total_segments=None):
+    """
+    セグメント分割したScanを並列に実行
+    
+    Args:
+        params: scanのパラメーター（TableName, FilterExpression等）
+        total_segments: セグメント数（省略時は設定値）
+        
+    Returns:
+        list: 取得したアイテム
+    """
+    dynamodb = get_dynamodb_client()
+    total_segments = total_segments or settings.DYNAMODB_SCAN_SEGMENTS
+
+    def scan_segment(segment):
+        items = []
+        last_evaluated_key = None
+        while True:
+            segment_params = {**params, 'Segment': segment, 'TotalSegments': total_segments}
+            if last_evaluated_key:
+                segment_params['ExclusiveStartKey'] = last_evaluated_key
+            response = dynamodb.scan(**segment_params)
+            items.extend(response.get('Items', []))
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                return items
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        return [item for items in executor.map(scan_segment, range(total_segments)) for item in items]
+
+
+def delete_auth_clients(client_ids):
+    """
+    クライアントをまとめて削除
+    
+    Args:
+        client_ids: クライアントIDのリスト
+        
+    Returns:
+        int: 削除件数
+    """
+    try:
+        return batch_write_items(get_table_name('auth_clients'), [
+            {'DeleteRequest': {'Key': {'client_id': {'S': client_id}}}}
+            for client_id in client_ids
+        ])
+    finally:
+        # 一部の削除に失敗した場合も含め、認証キャッシュから除外
+        _credentials_cache.invalidate(client_ids)
+
+
+def get_auth_client_ids_by_company_id(company_id, issued_before=None):
+    """
+    指定した会社IDに紐づくクライアントIDを取得
+    
+    取得はclient_idと発行日時のみに絞り、GSIで見つからない場合は並列Scanで検索する。
+    
+    Args:
+        company_id: 会社ID
+        issued_before: 指定した場合、この日時より前に発行されたクライアントのみ取得
+        
+    Returns:
+        list: クライアントIDのリスト
+    """
+    dynamodb = get_dynamodb_client()
+    table_name = get_table_name('auth_clients')
+
+    projection = 'client_id, issued_at, created_at'
+    items = []
+
+    # 1) GSIでのQuery（型: Number）を試す
+    try:
+        last_evaluated_key = None
+        while True:
+            params = {
+                'TableName': table_name,
+                'IndexName': 'idx_company_id',
+                'KeyConditionExpression': 'company_id = :company_id',
+                'ExpressionAttributeValues': {
+                    ':company_id': {'N': str(company_id)}
+                },
+                'ProjectionExpression': projection,
+            }
+            if last_evaluated_key:
+                params['ExclusiveStartKey'] = last_evaluated_key
+
+            response = dynamodb.query(**params)
+            items.extend(response.get('Items', []))
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+    except Exception as e:
+        # GSIが存在しない、型不一致などの場合はスキャンにフォールバック
+        print(f"Fallback to scan (query failed): {e}")
+
+    # 2) GSIで見つからなかった場合、並列Scanで検索
+    #    型が文字列の過去データ（型ぶれ）も同じScanで対象にする
+    if not items:
+        items = parallel_scan({
+            'TableName': table_name,
+            'FilterExpression': 'company_id = :company_id_n OR company_id = :company_id_s',
+            'ExpressionAttributeValues': {
+                ':company_id_n': {'N': str(company_id)},
+                ':company_id_s': {'S': str(company_id)},
+            },
+            'ProjectionExpression': projection,
+        })
+
+    client_ids = []
+    for item in items:
+        # 発行日時が不明なクライアントも失効の対象にする
+        issued_at = get_issued_at(item) if issued_before is not None else None
+        if issued_at is None or issued_at < issued_before:
+            client_ids.append(item['client_id']['S'])
+    return client_ids
+
+
 def delete_auth_clients_by_company_id(company_id):
     """
     指定した会社IDに紐づくクライアントをDynamoDBから削除
     
+    削除はBatchWriteItem（25件単位）で行う。
+    
     Args:
         company_id: 会社ID
         
@@ -199,98 +608,7 @@ def delete_auth_clients_by_company_id(company_id):
         bool: 全削除が成功した場合True（1件も存在しない場合もTrue）
     """
     try:
-        dynamodb = get_dynamodb_client()
-        table_name = f"{settings.DYNAMODB_TABLE_PREFIX}auth_clients"
-
-        deleted_count = 0
-
-        # 1) GSIでのQuery（型: Number）を試す
-        try:
-            last_evaluated_key = None
-            while True:
-                params = {
-                    'TableName': table_name,
-                    'IndexName': 'idx_company_id',
-                    'KeyConditionExpression': 'company_id = :company_id',
-                    'ExpressionAttributeValues': {
-                        ':company_id': {'N': str(company_id)}
-                    }
-                }
-                if last_evaluated_key:
-                    params['ExclusiveStartKey'] = last_evaluated_key
-
-                response = dynamodb.query(**params)
-                items = response.get('Items', [])
-                for item in items:
-                    client_id = item['client_id']['S']
-                    dynamodb.delete_item(
-                        TableName=table_name,
-                        Key={'client_id': {'S': client_id}}
-                    )
-                    deleted_count += 1
-
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
-        except Exception as e:
-            # GSIが存在しない、型不一致などの場合はスキャンにフォールバック
-            print(f"Fallback to scan (query failed): {e}")
-
-        # 2) GSIで削除できなかった場合、Scanでの削除（型: Number）
-        if deleted_count == 0:
-            last_evaluated_key = None
-            while True:
-                params = {
-                    'TableName': table_name,
-                    'FilterExpression': 'company_id = :company_id',
-                    'ExpressionAttributeValues': {
-                        ':company_id': {'N': str(company_id)}
-                    }
-                }
-                if last_evaluated_key:
-                    params['ExclusiveStartKey'] = last_evaluated_key
-
-                response = dynamodb.scan(**params)
-                items = response.get('Items', [])
-                for item in items:
-                    client_id = item['client_id']['S']
-                    dynamodb.delete_item(
-                        TableName=table_name,
-                        Key={'client_id': {'S': client_id}}
-                    )
-                    deleted_count += 1
-
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
-
-        # 3) さらに型が文字列の場合のフォールバック（過去データの型ぶれ対応）
-        if deleted_count == 0:
-            last_evaluated_key = None
-            while True:
-                params = {
-                    'TableName': table_name,
-                    'FilterExpression': 'company_id = :company_id',
-                    'ExpressionAttributeValues': {
-                        ':company_id': {'S': str(company_id)}
-                    }
-                }
-                if last_evaluated_key:
-                    params['ExclusiveStartKey'] = last_evaluated_key
-
-                response = dynamodb.scan(**params)
-                items = response.get('Items', [])
-                for item in items:
-                    client_id = item['client_id']['S']
-                    dynamodb.delete_item(
-                        TableName=table_name,
-                        Key={'client_id': {'S': client_id}}
-                    )
-                    deleted_count += 1
-
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+        delete_auth_clients(get_auth_client_ids_by_company_id(company_id))
 
         # 対象がなくても削除成功として扱う
         return True
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.dynamodb_utils import (
+    generate_client_credentials,
+    create_auth_client,
+    verify_client_credentials,
+    clear_credentials_cache,
+    get_dynamodb_client,
+    get_table_name,
+)
+from companies.tokens import issue_access_token, verify_access_token
+
+
+class Command(BaseCommand):
+    help = 'クライアント認証情報の検証とアクセストークンの検証の秒間処理回数を比較します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='計測回数')
+        parser.add_argument('--company-id', type=int, default=0, help='計測用クライアントに設定する会社ID')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # 計測用のクライアントを登録
+        client_id, client_secret, secret_hash = generate_client_credentials()
+        if not create_auth_client(options['company_id'], client_id, secret_hash):
+            self.stderr.write(self.style.ERROR('計測用クライアントの登録に失敗しました。'))
+            return
+
+        try:
+            client = verify_client_credentials(client_id, client_secret)
+            if client is None:
+                self.stderr.write(self.style.ERROR('検証に失敗しました。'))
+                return
+            access_token, _ = issue_access_token(client)
+
+            # 毎回DynamoDBで認証情報を検証
+            def credentials():
+                clear_credentials_cache()
+                return verify_client_credentials(client_id, client_secret)
+
+            # 認証結果のキャッシュを利用
+            def cached_credentials():
+                return verify_client_credentials(client_id, client_secret)
+
+            # アクセストークンの署名のみを検証
+            def token():
+                return verify_access_token(access_token)
+
+            for label, func in (
+                ('認証情報（DynamoDB）', credentials),
+                ('認証情報（キャッシュ）', cached_credentials),
+                ('アクセストークン', token),
+            ):
+                func()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    if func() is None:
+                        self.stderr.write(self.style.ERROR('検証に失敗しました。'))
+                        return
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{label}: {iterations / elapsed:.1f} 回/秒 (平均 {elapsed / iterations * 1000000:.1f}µs)')
+        finally:
+            get_dynamodb_client().delete_item(
+                TableName=get_table_name('auth_clients'),
+                Key={'client_id': {'S': client_id}}
+            )
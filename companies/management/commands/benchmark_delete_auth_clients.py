@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.dynamodb_utils import (
+    batch_write_items,
+    delete_auth_clients_by_company_id,
+    generate_client_credentials,
+    get_dynamodb_client,
+    get_table_name,
+)
+
+
+class Command(BaseCommand):
+    help = 'DynamoDB Localに対して会社単位のクライアント削除（1件ずつ/バッチ）の所要時間を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=3000, help='計測用に登録するクライアント数')
+        parser.add_argument('--company-id', type=int, default=999999, help='計測用クライアントに設定する会社ID')
+
+    def seed(self, company_id, count):
+        """計測用のクライアントを登録"""
+        requests = []
+        for _ in range(count):
+            client_id, _, secret_hash = generate_client_credentials()
+            requests.append({'PutRequest': {'Item': {
+                'client_id': {'S': client_id},
+                'company_id': {'N': str(company_id)},
+                'secret_hash': {'S': secret_hash},
+                'is_active': {'N': '1'},
+                'created_at': {'S': '2000-01-01T00:00:00Z'},
+            }}})
+        batch_write_items(get_table_name('auth_clients'), requests)
+
+    def delete_one_by_one(self, company_id):
+        """変更前の動作: Queryしたクライアントを1件ずつ削除"""
+        dynamodb = get_dynamodb_client()
+        table_name = get_table_name('auth_clients')
+        last_evaluated_key = None
+        while True:
+            params = {
+                'TableName': table_name,
+                'IndexName': 'idx_company_id',
+                'KeyConditionExpression': 'company_id = :company_id',
+                'ExpressionAttributeValues': {':company_id': {'N': str(company_id)}},
+            }
+            if last_evaluated_key:
+                params['ExclusiveStartKey'] = last_evaluated_key
+            response = dynamodb.query(**params)
+            for item in response.get('Items', []):
+                dynamodb.delete_item(TableName=table_name, Key={'client_id': item['client_id']})
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+
+    def handle(self, *args, **options):
+        company_id = options['company_id']
+        count = options['clients']
+
+        for label, delete in (
+            ('1件ずつ削除', self.delete_one_by_one),
+            ('バッチ削除', delete_auth_clients_by_company_id),
+        ):
+            self.seed(company_id, count)
+            started = time.perf_counter()
+            delete(company_id)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{label}: {count}件 {elapsed:.2f}s ({count / elapsed:.0f} 件/秒)')
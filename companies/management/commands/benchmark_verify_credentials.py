@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.dynamodb_utils import (
+    generate_client_credentials,
+    create_auth_client,
+    verify_client_credentials,
+    get_dynamodb_client,
+    get_table_name,
+    reset_dynamodb_client,
+    clear_credentials_cache,
+    get_credentials_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = 'DynamoDB Localに対してverify_client_credentialsの秒間検証回数を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='計測回数')
+        parser.add_argument('--company-id', type=int, default=0, help='計測用クライアントに設定する会社ID')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        # 計測用のクライアントを登録
+        client_id, client_secret, secret_hash = generate_client_credentials()
+        if not create_auth_client(options['company_id'], client_id, secret_hash):
+            self.stderr.write(self.style.ERROR('計測用クライアントの登録に失敗しました。'))
+            return
+
+        try:
+            # 毎回クライアントを生成（キャッシュなし）
+            def per_call():
+                reset_dynamodb_client()
+                clear_credentials_cache()
+                return verify_client_credentials(client_id, client_secret)
+
+            # 共有クライアントを使い回す（キャッシュなし）
+            def pooled():
+                clear_credentials_cache()
+                return verify_client_credentials(client_id, client_secret)
+
+            # 認証結果のキャッシュを利用
+            def cached():
+                return verify_client_credentials(client_id, client_secret)
+
+            for label, func in (('クライアント毎回生成', per_call), ('共有クライアント', pooled), ('キャッシュ', cached)):
+                # 初回接続分を計測から除外
+                func()
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    if func() is None:
+                        self.stderr.write(self.style.ERROR('検証に失敗しました。'))
+                        return
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{label}: {iterations / elapsed:.1f} 回/秒 (平均 {elapsed / iterations * 1000:.2f}ms)')
+
+            stats = get_credentials_cache_stats()
+            self.stdout.write(f"キャッシュ: ヒット {stats['hits']}回 / ミス {stats['misses']}回")
+        finally:
+            get_dynamodb_client().delete_item(
+                TableName=get_table_name('auth_clients'),
+                Key={'client_id': {'S': client_id}}
+            )
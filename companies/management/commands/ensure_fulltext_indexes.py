@@ -0,0 +1,53 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from terao_navi_web.search import get_fulltext_indexes
+
+
+def get_index_name(table, columns):
+    """FULLTEXTインデックス名（MySQLの上限64文字に収める）"""
+    return f"ft_{table}_{'_'.join(columns)}"[:64]
+
+
+class Command(BaseCommand):
+    help = 'モデルのsearch_fieldsに対応するFULLTEXTインデックス（ngramパーサー）が存在しない場合は作成します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='実行するSQLを表示のみ行う')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'mysql':
+            raise CommandError('FULLTEXTインデックスはMySQLのみ対応しています。')
+
+        # 作成するインデックス（関連モデルの検索で同じ列の組み合わせが重複する場合は1つにまとめる）
+        required = {}
+        for model in apps.get_models():
+            if not getattr(model, 'search_fields', None):
+                continue
+            for _, target, names in get_fulltext_indexes(model):
+                columns = tuple(target._meta.get_field(name).column for name in names)
+                required[(target._meta.db_table, columns)] = get_index_name(target._meta.db_table, columns)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name, index_name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND index_type = 'FULLTEXT'"
+            )
+            existing = {(table, name) for table, name in cursor.fetchall()}
+
+            quote = connection.ops.quote_name
+            for (table, columns), name in required.items():
+                if (table, name) in existing:
+                    self.stdout.write(f'作成済み: {table}.{name}')
+                    continue
+                sql = (
+                    f"ALTER TABLE {quote(table)} ADD FULLTEXT INDEX {quote(name)} "
+                    f"({', '.join(quote(column) for column in columns)}) WITH PARSER ngram"
+                )
+                if options['dry_run']:
+                    self.stdout.write(sql)
+                    continue
+                # FULLTEXTインデックスの作成中はテーブルへの書き込みがブロックされるため、利用の少ない時間帯に実行する
+                cursor.execute(sql)
+                self.stdout.write(self.style.SUCCESS(f'作成しました: {table}.{name}'))
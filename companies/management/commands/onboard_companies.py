@@ -0,0 +1,158 @@
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.dynamodb_utils import (
+    generate_client_credentials,
+    create_auth_clients,
+    delete_auth_clients,
+    get_company_ids_with_clients,
+)
+from companies.forms import CompanyForm
+from companies.models import Company
+
+
+# 会社の重複判定に使う項目（既存の会社と一致する行は作成しない）
+COMPANY_FIELDS = ('name', 'address', 'tel')
+
+# 出力ファイルの項目
+OUTPUT_FIELDS = ('company_id', 'company_name', 'client_id', 'client_secret')
+
+
+class Command(BaseCommand):
+    help = (
+        'CSV/JSONLファイルから会社を一括登録し、クライアント認証情報を発行します。'
+        '会社名・住所・電話番号が一致する会社（削除済みを含む）は作成せず、認証情報が未発行の会社のみ発行するため、'
+        '途中で失敗した場合も同じファイルで再実行できます。削除済みの会社と一致した行は一覧を表示し、認証情報も発行しません。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='会社一覧のファイル（.csv または .jsonl、項目: name, address, tel）')
+        parser.add_argument('--output', required=True, help='発行したクライアント認証情報の出力先（CSV、追記）')
+        parser.add_argument('--batch-size', type=int, default=500, help='1回あたりの登録件数')
+        parser.add_argument('--dry-run', action='store_true', help='登録せずに件数のみ表示')
+
+    def read_rows(self, path):
+        """入力ファイルを読み込み、会社ごとの項目を返す"""
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            if path.endswith('.jsonl'):
+                for line_number, line in enumerate(f, start=1):
+                    if line.strip():
+                        try:
+                            yield line_number, json.loads(line)
+                        except ValueError as e:
+                            raise CommandError(f'{line_number}行目: JSONの形式が正しくありません: {e}')
+            else:
+                for line_number, row in enumerate(csv.DictReader(f), start=2):
+                    yield line_number, row
+
+    def load_companies(self, path):
+        """入力ファイルの検証と重複除去"""
+        companies = {}
+        errors = []
+        for line_number, row in self.read_rows(path):
+            form = CompanyForm({field: str(row.get(field) or '').strip() for field in COMPANY_FIELDS})
+            if not form.is_valid():
+                errors.append(f'{line_number}行目: {form.errors.as_text()}')
+                continue
+            key = tuple(form.cleaned_data[field] for field in COMPANY_FIELDS)
+            companies.setdefault(key, form.cleaned_data)
+        if errors:
+            raise CommandError('入力ファイルにエラーがあります。\n' + '\n'.join(errors))
+        return companies
+
+    def find_existing(self, keys):
+        """重複判定の項目が一致する既存の会社を取得（削除済みを含み、有効な会社を優先する）"""
+        existing = {}
+        names = list({name for name, _, _ in keys})
+        for start in range(0, len(names), 500):
+            companies = Company.all_objects.filter(name__in=names[start:start + 500]).order_by('is_deleted', 'company_id')
+            for company in companies:
+                key = tuple(getattr(company, field) for field in COMPANY_FIELDS)
+                if key in keys:
+                    existing.setdefault(key, company)
+        return existing
+
+    def open_output(self, path):
+        """出力ファイルを追記モードで開く（認証情報を含むため所有者のみ読み書き可能にする）"""
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        f = open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600), 'w', encoding='utf-8', newline='')
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS)
+        if is_new:
+            writer.writeheader()
+        return f, writer
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        companies = self.load_companies(options['input'])
+
+        # 未作成の会社をまとめて作成
+        existing = self.find_existing(companies)
+        new_companies = [
+            Company(**data) for key, data in companies.items() if key not in existing
+        ]
+        deleted = [company for company in existing.values() if company.is_deleted]
+        self.stdout.write(
+            f'入力: {len(companies)}社 / 作成済み: {len(existing) - len(deleted)}社 / '
+            f'削除済み: {len(deleted)}社 / 新規作成: {len(new_companies)}社'
+        )
+        # 削除済みの会社は作成し直さない（必要な場合は管理画面で復元し、認証情報を再発行する）
+        for company in deleted:
+            self.stdout.write(self.style.WARNING(
+                f'  削除済みの会社と一致するためスキップしました: 会社ID {company.company_id} {company.name}'
+            ))
+
+        if options['dry_run']:
+            return
+
+        if new_companies:
+            Company.objects.bulk_create(new_companies, batch_size=batch_size)
+            # MySQLのbulk_createは主キーを返さないため、作成後に取得し直す
+            existing = self.find_existing(companies)
+
+        # 認証情報が未発行の会社のみ発行
+        issued_company_ids = get_company_ids_with_clients()
+        targets = [
+            company for company in existing.values()
+            if not company.is_deleted and company.company_id not in issued_company_ids
+        ]
+        self.stdout.write(f'認証情報の発行: {len(targets)}社')
+
+        output, writer = self.open_output(options['output'])
+        issued = 0
+        try:
+            for start in range(0, len(targets), batch_size):
+                rows = []
+                clients = []
+                for company in targets[start:start + batch_size]:
+                    client_id, client_secret, secret_hash = generate_client_credentials()
+                    clients.append((company.company_id, client_id, secret_hash))
+                    rows.append({
+                        'company_id': company.company_id,
+                        'company_name': company.name,
+                        'client_id': client_id,
+                        'client_secret': client_secret,
+                    })
+
+                # 有効になっていない認証情報を出力しないよう、DynamoDBへの登録後に出力ファイルへ書き出す
+                # （登録に失敗した場合は出力されず、再実行時に改めて発行される）
+                try:
+                    create_auth_clients(clients)
+                except Exception:
+                    # 一部のみ登録された会社も再実行時に発行し直すよう、このバッチの登録を取り消す
+                    delete_auth_clients([client_id for _, client_id, _ in clients])
+                    raise
+                writer.writerows(rows)
+                output.flush()
+                os.fsync(output.fileno())
+                issued += len(clients)
+                self.stdout.write(f'  {issued}/{len(targets)}社')
+        finally:
+            output.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'会社を{len(new_companies)}社作成し、クライアント認証情報を{issued}件発行しました。'
+            f'認証情報は {options["output"]} に出力しました。'
+        ))
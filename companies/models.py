@@ -1,8 +1,82 @@
-from django.db import models
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.dispatch import Signal
 from django.utils import timezone
 
 
-class SoftDeleteManager(models.Manager):
+# soft_delete() / restore() でまとめて更新した後に送信（sender: 対象のモデル）
+# UPDATEで更新するためpost_saveは送信されない。キャッシュの無効化等に使う
+soft_delete_changed = Signal()
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """
+    論理削除用クエリセット
+
+    soft_delete() / restore() / hard_delete() はレコード数によらず、テーブルごとに1回の
+    UPDATE/DELETEで実行する。モデルの soft_delete_cascade に指定した関連モデル
+    （'app_label.Model', 外部キー名）も同じ削除日時でまとめて削除・復元する。
+    """
+
+    def soft_delete(self, now=None):
+        """
+        まとめて論理削除（関連レコードも削除）
+
+        Args:
+            now: 削除日時（省略時は現在日時）
+
+        Returns:
+            int: 削除した件数（関連レコードを除く）
+        """
+        with transaction.atomic(using=self.db):
+            count = self._soft_delete(now or timezone.now())
+        soft_delete_changed.send(sender=self.model)
+        return count
+
+    def restore(self, now=None):
+        """
+        まとめて削除を取り消す（同じ削除で削除された関連レコードも復元）
+
+        Args:
+            now: 更新日時（省略時は現在日時）
+
+        Returns:
+            int: 復元した件数（関連レコードを除く）
+        """
+        with transaction.atomic(using=self.db):
+            count = self._restore(now or timezone.now())
+        soft_delete_changed.send(sender=self.model)
+        return count
+
+    def hard_delete(self):
+        """まとめて物理削除"""
+        return super().delete()
+
+    def _cascade_querysets(self):
+        """soft_delete_cascadeに指定した関連モデルのクエリセットと外部キー名を取得"""
+        for model_label, field_name in getattr(self.model, 'soft_delete_cascade', ()):
+            model = apps.get_model(model_label)
+            yield model.all_objects.using(self.db), model._meta.get_field(field_name).attname
+
+    def _soft_delete(self, now):
+        targets = self.filter(is_deleted=False)
+        # 関連レコードを先に削除（親の削除フラグを更新する前に対象を絞り込む）
+        for queryset, attname in self._cascade_querysets():
+            queryset.filter(**{f'{attname}__in': targets.values('pk')})._soft_delete(now)
+        return targets.update(is_deleted=True, deleted_at=now, updated_at=now)
+
+    def _restore(self, now):
+        targets = self.filter(is_deleted=True)
+        # 親と同じ削除日時の関連レコードのみ復元（個別に削除されていたレコードは残す）
+        for queryset, attname in self._cascade_querysets():
+            queryset.filter(
+                Exists(targets.filter(pk=OuterRef(attname), deleted_at=OuterRef('deleted_at')))
+            )._restore(now)
+        return targets.update(is_deleted=False, deleted_at=None, updated_at=now)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
     """論理削除用マネージャー"""
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
@@ -28,7 +102,16 @@ class Company(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    # 論理削除・復元をまとめて行う関連モデル
+    soft_delete_cascade = [
+        ('applications.Application', 'company'),
+        ('users.User', 'company'),
+    ]
+
+    # 一覧画面の検索対象（terao_navi_web.search、FULLTEXTインデックスはensure_fulltext_indexesで作成）
+    search_fields = ('name', 'address', 'tel')
 
     class Meta:
         db_table = 'companies'
@@ -39,26 +122,30 @@ class Company(models.Model):
         return self.name
     
     def delete(self, using=None, keep_parents=False):
-        """論理削除（関連するユーザー、アプリケーション、マニュアルも削除）"""
-        # 関連するアプリケーションを削除（これによりマニュアルも削除される）
-        for application in self.applications.filter(is_deleted=False):
-            application.delete()
-        
-        # 関連するユーザーを論理削除
-        for user in self.users.filter(is_deleted=False):
-            user.delete()
-        
-        # 会社自体を論理削除
+        """
+        論理削除（関連するユーザー、アプリケーション、マニュアルも削除）
+
+        関連レコードはテーブルごとに1回のUPDATEでまとめて削除するため、件数によらずクエリ数は一定。
+        """
+        now = timezone.now()
+        Company.all_objects.filter(pk=self.pk).soft_delete(now)
         self.is_deleted = True
-        self.deleted_at = timezone.now()
-        self.save()
+        self.deleted_at = now
+        self.updated_at = now
     
     def hard_delete(self):
         """物理削除"""
         super().delete()
     
     def restore(self):
-        """削除を取り消す"""
+        """
+        削除を取り消す（会社の削除時にまとめて削除された関連レコードも復元）
+
+        DynamoDBのクライアント認証情報は削除時に消えるため復元されない。
+        復元後は会社詳細画面から再発行する（companies.views.company_credentials_reissue）。
+        """
+        now = timezone.now()
+        Company.all_objects.filter(pk=self.pk).restore(now)
         self.is_deleted = False
         self.deleted_at = None
-        self.save()
+        self.updated_at = now
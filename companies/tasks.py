@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+from jobs.models import Job
+from jobs.queue import register_job
+from .dynamodb_utils import (
+    create_auth_clients,
+    delete_auth_clients,
+    get_auth_client_ids_by_company_id,
+)
+from .models import Company
+
+
+# DynamoDBへの反映をまとめて行う件数（BatchWriteItemは25件単位で並列に送信される）
+AUTH_CLIENT_JOB_BATCH_SIZE = 100
+
+# 失効ジョブの冪等キー（会社ID・失効日時ごとに1件）
+REVOKE_AUTH_CLIENTS_KEY = 'companies.delete_auth_clients:{company_id}:{revoked_before}'
+
+
+def get_revoked_before(company_ids):
+    """
+    会社ごとの最新の失効日時（これより前に発行した認証情報は無効）
+
+    失効ジョブの冪等キー（会社IDで始まる）で検索するため、ジョブの実行状態によらず取得できる。
+
+    Returns:
+        dict: {会社ID: 失効日時}
+    """
+    condition = Q()
+    for company_id in company_ids:
+        condition |= Q(idempotency_key__startswith=REVOKE_AUTH_CLIENTS_KEY.format(company_id=company_id, revoked_before=''))
+    if not condition:
+        return {}
+
+    revoked = {}
+    for payload in Job.objects.filter(condition, job_type='companies.delete_auth_clients').values_list('payload', flat=True):
+        if not payload.get('revoked_before'):
+            continue
+        revoked_before = datetime.fromisoformat(payload['revoked_before'])
+        company_id = payload['company_id']
+        if company_id not in revoked or revoked[company_id] < revoked_before:
+            revoked[company_id] = revoked_before
+    return revoked
+
+
+@register_job('companies.create_auth_client', batch_size=AUTH_CLIENT_JOB_BATCH_SIZE)
+def create_auth_client_job(payloads):
+    """
+    会社作成・再発行時に発行したクライアント認証情報をDynamoDBへ登録
+
+    client_idをキーとした上書きのため、再試行しても重複しない。
+    登録前に削除された会社のクライアントと、登録前に失効した（発行後に会社の削除・再発行があった）
+    クライアントは登録しない。
+    """
+    company_ids = {payload['company_id'] for payload in payloads}
+    active_company_ids = set(
+        Company.objects.filter(company_id__in=company_ids).values_list('company_id', flat=True)
+    )
+    revoked = get_revoked_before(company_ids)
+
+    clients = []
+    for payload in payloads:
+        if payload['company_id'] not in active_company_ids:
+            continue
+        issued_at = payload.get('issued_at')
+        if issued_at and payload['company_id'] in revoked and datetime.fromisoformat(issued_at) < revoked[payload['company_id']]:
+            continue
+        clients.append((payload['company_id'], payload['client_id'], payload['secret_hash'], issued_at))
+    create_auth_clients(clients)
+
+
+@register_job('companies.delete_auth_clients', batch_size=AUTH_CLIENT_JOB_BATCH_SIZE)
+def delete_auth_clients_job(payloads):
+    """
+    会社の削除・認証情報の再発行時に、それより前に発行したクライアント認証情報をDynamoDBから削除
+
+    失効日時（revoked_before）より後に発行したクライアントは対象にしないため、
+    実行前に会社が復元・再発行されていても、削除前の認証情報のみ削除される。
+    削除済みのクライアントは対象にならないため、再試行しても問題ない。
+    """
+    # 同じ会社の失効は最新の日時でまとめる（失効日時のない過去のジョブはNoneとし、すべて削除）
+    revoked = {}
+    for payload in payloads:
+        company_id = payload['company_id']
+        revoked_before = payload.get('revoked_before')
+        revoked_before = datetime.fromisoformat(revoked_before) if revoked_before else None
+        if company_id in revoked and (
+            revoked[company_id] is None or (revoked_before is not None and revoked_before <= revoked[company_id])
+        ):
+            continue
+        revoked[company_id] = revoked_before
+
+    client_ids = []
+    for company_id, revoked_before in revoked.items():
+        client_ids.extend(get_auth_client_ids_by_company_id(company_id, revoked_before))
+    delete_auth_clients(client_ids)
@@ -1,3 +1,388 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import re
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User as AdminUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from applications import views as application_views
+from applications.models import Application
+from jobs.models import Job
+from manuals import views as manual_views
+from manuals.models import Manual
+from terao_navi_web.settings import parse_signing_keys
+from terao_navi_web.pagination import KeysetPage, paginate_by_keyset
+from users import views as user_views
+from users.models import Role, User
+from .models import Company
+from .tasks import create_auth_client_job, delete_auth_clients_job
+from .views import auth_token, company_detail, get_client_credentials_from_request
+
+
+class CompanySoftDeleteTests(TestCase):
+    """会社の論理削除・復元のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+
+    def create_company(self, size):
+        """アプリケーション・マニュアル・ユーザーをsize件ずつ持つ会社を作成"""
+        company = Company.objects.create(name=f'会社{size}', address='住所', tel='000')
+        Application.objects.bulk_create([
+            Application(company=company, application_name=f'アプリ{i}') for i in range(size)
+        ])
+        # MySQLのbulk_createは主キーを返さないため取得し直す
+        applications = list(Application.objects.filter(company=company))
+        Manual.objects.bulk_create([
+            Manual(application=application, company=company, manual_name=f'マニュアル{i}', file_path=f'{application.pk}/{i}.pdf')
+            for application in applications for i in range(size)
+        ])
+        User.objects.bulk_create([
+            User(company=company, username=f'user{size}_{i}', email=f'user{size}_{i}@example.com', password='x')
+            for i in range(size)
+        ])
+        return company
+
+    def test_delete_query_count_is_constant(self):
+        """関連レコードの件数によらずクエリ数が一定"""
+        small = self.create_company(1)
+        large = self.create_company(10)
+
+        with self.assertNumQueries(6) as small_context:
+            small.delete()
+        with self.assertNumQueries(len(small_context.captured_queries)):
+            large.delete()
+
+        self.assertFalse(Application.objects.filter(company=large).exists())
+        self.assertFalse(Manual.objects.filter(application__company=large).exists())
+        self.assertFalse(User.objects.filter(company=large).exists())
+        self.assertEqual(Manual.all_objects.filter(application__company=large, deleted_at=large.deleted_at).count(), 100)
+
+    def test_restore_only_restores_cascaded_records(self):
+        """会社の削除でまとめて削除されたレコードのみ復元"""
+        company = self.create_company(3)
+        deleted_before = Application.objects.filter(company=company).first()
+        deleted_before.delete()
+        company.delete()
+
+        with self.assertNumQueries(6):
+            company.restore()
+
+        self.assertTrue(Company.objects.filter(pk=company.pk).exists())
+        self.assertEqual(User.objects.filter(company=company).count(), 3)
+        self.assertEqual(Application.objects.filter(company=company).count(), 2)
+        self.assertFalse(Application.objects.filter(pk=deleted_before.pk).exists())
+        self.assertEqual(Manual.objects.filter(application__company=company).count(), 6)
+
+    def test_queryset_soft_delete_and_restore_many(self):
+        """クエリセットでまとめて削除・復元（会社数によらずクエリ数が一定）"""
+        companies = [self.create_company(2)] + [
+            Company.objects.create(name=f'追加{i}', address='住所', tel='000') for i in range(5)
+        ]
+        queryset = Company.all_objects.filter(pk__in=[company.pk for company in companies])
+
+        with self.assertNumQueries(6):
+            self.assertEqual(queryset.soft_delete(), 6)
+        self.assertFalse(Company.objects.filter(pk__in=[company.pk for company in companies]).exists())
+
+        with self.assertNumQueries(6):
+            self.assertEqual(queryset.restore(), 6)
+        self.assertEqual(Company.objects.filter(pk__in=[company.pk for company in companies]).count(), 6)
+        self.assertEqual(Manual.objects.filter(application__company=companies[0]).count(), 4)
+
+
+@skipUnless(connection.vendor == 'mysql', 'EXPLAINの形式がMySQL固有のため')
+class TenantListQueryPlanTests(TestCase):
+    """会社ごとの一覧クエリが複合インデックスを使うことのテスト（filesort・フルスキャンをしない）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+        for index in range(3):
+            company = Company.objects.create(name=f'会社{index}', address='住所', tel='000')
+            Application.objects.bulk_create([
+                Application(company=company, application_name=f'アプリ{i}') for i in range(30)
+            ])
+            User.objects.bulk_create([
+                User(company=company, username=f'user{index}_{i}', email=f'user{index}_{i}@example.com', password='x')
+                for i in range(30)
+            ])
+            application = Application.objects.filter(company=company).first()
+            Manual.objects.bulk_create([
+                Manual(application=application, company=company, manual_name=f'マニュアル{i}', file_path=f'{application.pk}/{i}.pdf')
+                for i in range(30)
+            ])
+        cls.company = Company.objects.first()
+        cls.user = User.objects.filter(company=cls.company).first()
+        cls.application = Application.objects.filter(company=cls.company).first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE TABLE companies, roles, users, applications, manuals')
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.superuser = AdminUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        # 一般ユーザーとしてログインしたセッション
+        self.session = SessionStore()
+        self.session.update({'is_user_authenticated': True, 'user_id': self.user.user_id})
+
+    def explain(self, sql):
+        """クエリの実行計画を取得"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def fetch_page(self, view, cursor=None):
+        """
+        RequestFactoryのリクエストで一覧を表示し、ページを取得したクエリと次ページのカーソルを返す
+
+        Args:
+            view: リクエストを受け取り、レスポンスまたはKeysetPageを返す関数
+        """
+        request = self.factory.get('/', {'cursor': cursor} if cursor else {})
+        request.user = self.superuser
+        request.session = self.session
+        with CaptureQueriesContext(connection) as context:
+            result = view(request)
+
+        if isinstance(result, KeysetPage):
+            next_cursor = result.next_cursor
+        else:
+            self.assertEqual(result.status_code, 200)
+            match = re.search(r'[?&]cursor=([\w-]+)', result.content.decode())
+            next_cursor = match and match.group(1)
+        # ページの取得（並び替えて件数を制限するクエリ）
+        queries = [query['sql'] for query in context.captured_queries if 'ORDER BY' in query['sql'] and 'LIMIT' in query['sql']]
+        return queries, next_cursor
+
+    def assertUsesIndex(self, view):
+        """一覧の1ページ目・2ページ目のクエリがfilesort・フルスキャンをしないことを検証"""
+        first_queries, next_cursor = self.fetch_page(view)
+        self.assertIsNotNone(next_cursor)
+        next_queries, _ = self.fetch_page(view, next_cursor)
+        self.assertTrue(first_queries and next_queries)
+
+        for sql in first_queries + next_queries:
+            # 一覧のテーブル（select_relatedで結合する会社・ロールは主キーで参照される）
+            table = re.search(r'FROM [`"](\w+)[`"]', sql).group(1)
+            for row in self.explain(sql):
+                with self.subTest(sql=sql, table=row['table'], key=row['key']):
+                    if row['table'] == table:
+                        self.assertNotEqual(row['type'], 'ALL')
+                    self.assertNotIn('Using filesort', row['Extra'] or '')
+
+    def test_general_user_list(self):
+        self.assertUsesIndex(user_views.general_user_list)
+
+    def test_admin_user_list(self):
+        self.assertUsesIndex(user_views.user_list)
+
+    def test_company_detail_user_list(self):
+        self.assertUsesIndex(lambda request: company_detail(request, self.company.company_id))
+
+    def test_application_list(self):
+        self.assertUsesIndex(application_views.application_list)
+
+    def test_manual_list(self):
+        self.assertUsesIndex(manual_views.manual_list)
+
+    def test_manual_list_by_application(self):
+        # アプリケーションごとのマニュアル一覧（画面はないため、ページネーションのみ）
+        self.assertUsesIndex(lambda request: paginate_by_keyset(
+            request, Manual.objects.filter(application_id=self.application.application_id)
+        ))
+
+
+class ClientCredentialsRequestTests(TestCase):
+    """アクセストークン発行APIのクライアント認証情報の取得のテスト"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def basic_request(self, value):
+        return self.factory.post('/api/token/', HTTP_AUTHORIZATION=value)
+
+    def test_basic_header(self):
+        encoded = base64.b64encode(b'client:secret').decode()
+        self.assertEqual(get_client_credentials_from_request(self.basic_request(f'Basic {encoded}')), ('client', 'secret'))
+
+    def test_malformed_basic_header(self):
+        self.assertEqual(get_client_credentials_from_request(self.basic_request('Basic !!!')), ('', ''))
+
+    def test_non_ascii_basic_header(self):
+        self.assertEqual(get_client_credentials_from_request(self.basic_request('Basic クライアント')), ('', ''))
+
+    def test_non_utf8_basic_header(self):
+        encoded = base64.b64encode(b'\xff\xfe:secret').decode()
+        self.assertEqual(get_client_credentials_from_request(self.basic_request(f'Basic {encoded}')), ('', ''))
+
+    def test_json_body(self):
+        request = self.factory.post(
+            '/api/token/',
+            json.dumps({'client_id': 'client', 'client_secret': 'secret'}),
+            content_type='application/json',
+        )
+        self.assertEqual(get_client_credentials_from_request(request), ('client', 'secret'))
+
+    def test_invalid_json_body(self):
+        request = self.factory.post('/api/token/', '[1, 2]', content_type='application/json')
+        self.assertEqual(get_client_credentials_from_request(request), ('', ''))
+
+    def test_form_body(self):
+        request = self.factory.post('/api/token/', {'client_id': 'client', 'client_secret': 'secret'})
+        self.assertEqual(get_client_credentials_from_request(request), ('client', 'secret'))
+
+    def test_non_ascii_header_returns_invalid_request(self):
+        """不正なヘッダーは500ではなくinvalid_requestを返す"""
+        with mock.patch('companies.views.verify_client_credentials') as verify:
+            response = auth_token(self.basic_request('Basic クライアント'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content), {'error': 'invalid_request'})
+        verify.assert_not_called()
+
+
+class AuthClientRevocationTests(TestCase):
+    """会社の削除・復元・再発行時のクライアント認証情報の失効のテスト"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name='会社', address='住所', tel='000')
+        self.superuser = AdminUser.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.superuser)
+        # DynamoDBに登録済みのクライアント（削除前に発行したもの）
+        self.items = [{'client_id': {'S': 'old'}, 'created_at': {'S': '2000-01-01T00:00:00Z'}}]
+        dynamodb = mock.Mock()
+        dynamodb.query.side_effect = lambda **params: {'Items': list(self.items)}
+        patches = {
+            'get_dynamodb_client': mock.patch('companies.dynamodb_utils.get_dynamodb_client', return_value=dynamodb),
+            'create_auth_clients': mock.patch('companies.tasks.create_auth_clients'),
+            'delete_auth_clients': mock.patch('companies.tasks.delete_auth_clients'),
+        }
+        for name, patcher in patches.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def run_jobs(self, job_type):
+        """登録されたジョブをまとめて実行し、実行したパラメーターを返す"""
+        jobs = Job.objects.filter(job_type=job_type, status=Job.STATUS_PENDING)
+        payloads = [job.payload for job in jobs]
+        handler = create_auth_client_job if job_type == 'companies.create_auth_client' else delete_auth_clients_job
+        handler(payloads)
+        jobs.update(status=Job.STATUS_DONE)
+        return payloads
+
+    def reissue(self):
+        """再発行し、登録ジョブで発行したクライアントをDynamoDBに反映"""
+        self.client.post(reverse('company_credentials_reissue', args=[self.company.company_id]))
+        payload = self.run_jobs('companies.create_auth_client')[0]
+        self.items.append({'client_id': {'S': payload['client_id']}, 'issued_at': {'S': payload['issued_at']}})
+        return payload['client_id']
+
+    def test_reissue_revokes_existing_clients(self):
+        """再発行すると、それまでの認証情報は削除される"""
+        new_client_id = self.reissue()
+        self.run_jobs('companies.delete_auth_clients')
+
+        self.delete_auth_clients.assert_called_once_with(['old'])
+        self.assertNotIn(new_client_id, self.delete_auth_clients.call_args.args[0])
+
+    def test_delete_revokes_clients_even_if_restored_before_job(self):
+        """削除ジョブの実行前に復元・再発行しても、削除前の認証情報は削除される"""
+        self.client.post(reverse('company_delete', args=[self.company.company_id]))
+        self.company.refresh_from_db()
+        self.company.restore()
+        new_client_id = self.reissue()
+        self.run_jobs('companies.delete_auth_clients')
+
+        deleted = [client_id for call in self.delete_auth_clients.call_args_list for client_id in call.args[0]]
+        self.assertEqual(deleted, ['old'])
+        self.assertNotIn(new_client_id, deleted)
+
+    def test_create_job_skips_clients_revoked_before_registration(self):
+        """登録前に失効した認証情報は、会社が復元されていても登録しない"""
+        with mock.patch('companies.views.generate_client_credentials', return_value=('created', 'secret', 'hash')):
+            self.client.post(reverse('company_create'), {'name': '新会社', 'address': '住所', 'tel': '000'})
+        company = Company.objects.get(name='新会社')
+        self.client.post(reverse('company_delete', args=[company.company_id]))
+        company.refresh_from_db()
+        company.restore()
+
+        self.run_jobs('companies.create_auth_client')
+
+        self.create_auth_clients.assert_called_once_with([])
+
+
+class SigningKeySettingsTests(TestCase):
+    """アクセストークンの署名鍵の設定値のテスト"""
+
+    def test_valid_keys(self):
+        self.assertEqual(parse_signing_keys('new:secret1,old:sec:ret2'), [('new', 'secret1'), ('old', 'sec:ret2')])
+
+    def test_invalid_keys_raise_improperly_configured(self):
+        for value in ('secret-without-kid', 'kid:', ':secret', 'v1.kid:secret', 'a:1,a:2', ''):
+            with self.subTest(value=value):
+                with self.assertRaises(ImproperlyConfigured):
+                    parse_signing_keys(value)
+
+
+class OnboardCompaniesCommandTests(TestCase):
+    """会社の一括登録コマンドのテスト"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.input = os.path.join(directory.name, 'companies.csv')
+        self.output = os.path.join(directory.name, 'credentials.csv')
+        with open(self.input, 'w', encoding='utf-8', newline='') as f:
+            f.write('name,address,tel\n削除済み会社,住所,000\n新規会社,住所,000\n')
+        patches = {
+            'get_company_ids_with_clients': mock.patch(
+                'companies.management.commands.onboard_companies.get_company_ids_with_clients', return_value=set(),
+            ),
+            'create_auth_clients': mock.patch('companies.management.commands.onboard_companies.create_auth_clients'),
+            'delete_auth_clients': mock.patch('companies.management.commands.onboard_companies.delete_auth_clients'),
+        }
+        for name, patcher in patches.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def run_command(self):
+        stdout = StringIO()
+        call_command('onboard_companies', self.input, output=self.output, stdout=stdout)
+        return stdout.getvalue()
+
+    def read_output(self):
+        with open(self.output, encoding='utf-8', newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_soft_deleted_company_is_reported_not_recreated(self):
+        """削除済みの会社と一致する行は作成し直さず、認証情報も発行しない"""
+        deleted = Company.objects.create(name='削除済み会社', address='住所', tel='000')
+        deleted.delete()
+
+        stdout = self.run_command()
+
+        self.assertIn(f'会社ID {deleted.company_id}', stdout)
+        self.assertEqual(Company.all_objects.filter(name='削除済み会社').count(), 1)
+        self.assertEqual([row['company_name'] for row in self.read_output()], ['新規会社'])
+
+    def test_secrets_not_written_when_registration_fails(self):
+        """DynamoDBへの登録に失敗した認証情報は出力せず、登録を取り消す"""
+        self.create_auth_clients.side_effect = RuntimeError('DynamoDB unavailable')
+
+        with self.assertRaises(RuntimeError):
+            self.run_command()
+
+        self.assertEqual(self.read_output(), [])
+        self.delete_auth_clients.assert_called_once()
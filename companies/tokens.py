@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+
+# 署名済みトークンのバージョン（形式を変更する場合に更新）
+TOKEN_VERSION = 'v1'
+
+# 署名鍵 {kid: bytes}（設定値が変わった場合のみ作り直す）
+_signing_keys = None
+_signing_keys_source = None
+
+
+def _get_signing_keys():
+    """
+    署名鍵を取得
+
+    AUTH_TOKEN_SIGNING_KEYS の先頭が署名に使う現在の鍵で、残りはローテーション中の
+    旧鍵として検証のみに使う。
+    """
+    global _signing_keys, _signing_keys_source
+
+    source = settings.AUTH_TOKEN_SIGNING_KEYS
+    if _signing_keys is None or _signing_keys_source is not source:
+        _signing_keys = {kid: secret.encode() for kid, secret in source}
+        _signing_keys_source = source
+    return _signing_keys
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(key, signing_input):
+    return _b64encode(hmac.new(key, signing_input.encode('ascii'), hashlib.sha256).digest())
+
+
+def issue_access_token(client):
+    """
+    クライアント情報からアクセストークンを発行
+
+    Args:
+        client: verify_client_credentialsが返したクライアント情報
+
+    Returns:
+        tuple: (トークン, 有効秒数)
+    """
+    kid, _ = settings.AUTH_TOKEN_SIGNING_KEYS[0]
+    expires_in = settings.AUTH_TOKEN_TTL
+    payload = _b64encode(json.dumps({
+        'sub': client['client_id'],
+        'company_id': client['company_id'],
+        'exp': int(time.time()) + expires_in,
+    }, separators=(',', ':')).encode())
+
+    signing_input = f"{TOKEN_VERSION}.{kid}.{payload}"
+    return f"{signing_input}.{_sign(_get_signing_keys()[kid], signing_input)}", expires_in
+
+
+def verify_access_token(token):
+    """
+    アクセストークンを検証（署名と有効期限のみを確認し、I/Oは行わない）
+
+    Args:
+        token: アクセストークン
+
+    Returns:
+        dict or None: 検証成功時にトークンの内容（sub, company_id, exp）を返す、失敗時None
+    """
+    try:
+        version, kid, payload, signature = token.split('.')
+    except (AttributeError, ValueError):
+        return None
+
+    key = _get_signing_keys().get(kid)
+    if version != TOKEN_VERSION or key is None:
+        return None
+
+    if not hmac.compare_digest(signature, _sign(key, f"{version}.{kid}.{payload}")):
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+
+    if claims.get('exp', 0) <= time.time():
+        return None
+    return claims
+
+
+def get_bearer_token(request):
+    """Authorizationヘッダーからベアラートークンを取得"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    return token.strip()
+
+
+def require_access_token(view_func):
+    """
+    アクセストークンが必要なAPIビュー用のデコレーター
+
+    検証に成功した場合はトークンの内容を request.auth_client に設定する。
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        claims = verify_access_token(get_bearer_token(request))
+        if claims is None:
+            response = JsonResponse({'error': 'invalid_token'}, status=401)
+            response['WWW-Authenticate'] = 'Bearer error="invalid_token"'
+            return response
+        request.auth_client = claims
+        return view_func(request, *args, **kwargs)
+    return wrapper
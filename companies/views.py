@@ -1,15 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
+from django.db import transaction
 from django.db.models import Q, Count
 from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import base64
+import json
 from .models import Company
 from .forms import CompanyForm
 from .dynamodb_utils import (
     generate_client_credentials,
-    create_auth_client,
-    delete_auth_clients_by_company_id,
+    verify_client_credentials,
 )
+from .tasks import REVOKE_AUTH_CLIENTS_KEY
+from .tokens import issue_access_token
+from jobs.queue import enqueue
+from terao_navi_web.pagination import paginate_by_keyset
+from terao_navi_web.search import paginate_search
 
 
 def is_superuser(user):
@@ -27,46 +37,73 @@ def company_list(request):
         user_count=Count('users', filter=Q(users__is_deleted=False))
     )
     
-    if query:
-        companies = companies.filter(
-            Q(name__icontains=query) |
-            Q(address__icontains=query) |
-            Q(tel__icontains=query)
-        )
-    
+    page = paginate_search(request, companies, query)
     context = {
-        'companies': companies.order_by('-created_at'),
+        'companies': page.object_list,
+        'page': page,
         'query': query,
     }
     return render(request, 'admin/companies/company_list.html', context)
 
 
+def revoke_client_credentials(company_id, revoked_before):
+    """
+    指定日時より前に発行した会社のクライアント認証情報を削除するジョブを登録
+
+    会社の削除・再発行と同じトランザクション内で呼び出す。
+    """
+    revoked_before = revoked_before.isoformat()
+    enqueue(
+        'companies.delete_auth_clients',
+        {'company_id': company_id, 'revoked_before': revoked_before},
+        idempotency_key=REVOKE_AUTH_CLIENTS_KEY.format(company_id=company_id, revoked_before=revoked_before),
+    )
+
+
+def issue_client_credentials(request, company, reissued=False):
+    """
+    クライアント認証情報を発行し、DynamoDBへの登録ジョブを登録
+
+    シークレットはDynamoDBにハッシュのみ保存するため、ダウンロード用にセッションへ一時保存する。
+    再発行の場合は、それまでに発行した認証情報の削除ジョブも登録する。
+    登録ジョブは会社の保存と同じトランザクション内で呼び出す。
+    """
+    client_id, client_secret, secret_hash = generate_client_credentials()
+    issued_at = timezone.now()
+    enqueue(
+        'companies.create_auth_client',
+        {
+            'company_id': company.company_id,
+            'client_id': client_id,
+            'secret_hash': secret_hash,
+            'issued_at': issued_at.isoformat(),
+        },
+        idempotency_key=f'companies.create_auth_client:{client_id}',
+    )
+    if reissued:
+        revoke_client_credentials(company.company_id, issued_at)
+    request.session['new_client_credentials'] = {
+        'company_id': company.company_id,
+        'company_name': company.name,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'reissued': reissued,
+    }
+
+
 @user_passes_test(is_superuser, login_url='/login/')
 def company_create(request):
     """会社作成"""
     if request.method == 'POST':
         form = CompanyForm(request.POST)
         if form.is_valid():
-            # 会社を作成
-            company = form.save()
-            
-            # クライアント認証情報を生成
-            client_id, client_secret, secret_hash = generate_client_credentials()
-            
-            # DynamoDBに登録
-            if create_auth_client(company.company_id, client_id, secret_hash):
-                # セッションに認証情報を一時保存（ダウンロード用）
-                request.session['new_client_credentials'] = {
-                    'company_id': company.company_id,
-                    'company_name': company.name,
-                    'client_id': client_id,
-                    'client_secret': client_secret,
-                }
-                messages.success(request, f'会社「{company.name}」を作成しました。クライアント認証情報をダウンロードしてください。')
-                return redirect('company_credentials_download', company_id=company.company_id)
-            else:
-                messages.error(request, 'クライアント認証情報の作成に失敗しました。')
-                return redirect('company_list')
+            # 会社の作成と、DynamoDBへの登録ジョブを同じトランザクションで登録
+            with transaction.atomic():
+                company = form.save()
+                issue_client_credentials(request, company)
+
+            messages.success(request, f'会社「{company.name}」を作成しました。クライアント認証情報をダウンロードしてください。')
+            return redirect('company_credentials_download', company_id=company.company_id)
     else:
         form = CompanyForm()
     
@@ -101,27 +138,48 @@ def company_delete(request, company_id):
         company_name = company.name
         target_company_id = company.company_id
         
-        # Django側の会社削除
-        company.delete()
+        # 会社の削除と、DynamoDB側のクライアント認証情報の削除ジョブを同じトランザクションで登録
+        # （削除日時より前に発行した認証情報が対象のため、後で復元しても元の認証情報は無効のまま）
+        with transaction.atomic():
+            company.delete()
+            revoke_client_credentials(target_company_id, company.deleted_at)
         messages.success(request, f'会社「{company_name}」を削除しました。')
 
-        # DynamoDB側のクライアント認証情報を削除
-        deleted = delete_auth_clients_by_company_id(target_company_id)
-        if not deleted:
-            messages.warning(request, '会社は削除されましたが、DynamoDBのクライアント認証情報の削除に失敗しました。後ほど手動でご確認ください。')
-
         return redirect('company_list')
     
     return render(request, 'admin/companies/company_confirm_delete.html', {'company': company, 'user_count': user_count})
 
 
+@user_passes_test(is_superuser, login_url='/login/')
+@require_POST
+def company_credentials_reissue(request, company_id):
+    """
+    クライアント認証情報の再発行
+
+    新しい認証情報を発行し、それまでの認証情報は削除する（漏えい時のローテーションにも使う）。
+    会社の削除時にDynamoDBのクライアント認証情報は削除され、復元しても元に戻らないため、
+    復元した会社もここで新しい認証情報を発行する。
+    """
+    company = get_object_or_404(Company, company_id=company_id)
+    with transaction.atomic():
+        issue_client_credentials(request, company, reissued=True)
+    messages.success(request, f'会社「{company.name}」のクライアント認証情報を再発行しました。ダウンロードしてください。')
+    return redirect('company_credentials_download', company_id=company.company_id)
+
+
 @user_passes_test(is_superuser, login_url='/login/')
 def company_detail(request, company_id):
     """会社詳細"""
     company = get_object_or_404(Company, company_id=company_id)
-    users = company.users.all().order_by('-created_at')
+    users = company.users.all()
+    page = paginate_by_keyset(request, users)
     
-    return render(request, 'admin/companies/company_detail.html', {'company': company, 'users': users})
+    return render(request, 'admin/companies/company_detail.html', {
+        'company': company,
+        'users': page.object_list,
+        'user_count': users.count(),
+        'page': page,
+    })
 
 
 @user_passes_test(is_superuser, login_url='/login/')
@@ -157,6 +215,7 @@ def company_credentials_json(request, company_id):
     
     # セッションから認証情報を削除（一度きり）
     del request.session['new_client_credentials']
+    credentials.pop('reissued', None)
     
     # JSON形式でレスポンス
     import json
@@ -169,3 +228,59 @@ def company_credentials_json(request, company_id):
     response['Content-Disposition'] = f'attachment; filename="client_credentials_{company_id}.json"'
     
     return response
+
+
+def get_client_credentials_from_request(request):
+    """
+    リクエストからクライアント認証情報を取得
+    
+    Basic認証ヘッダー、JSON、フォームの順に参照する。
+    
+    Returns:
+        tuple: (client_id, client_secret)
+    """
+    scheme, _, encoded = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'basic' and encoded:
+        try:
+            client_id, _, client_secret = base64.b64decode(encoded).decode().partition(':')
+            return client_id, client_secret
+        except ValueError:
+            # 不正なBase64・非ASCII文字・UTF-8として不正なバイト列（binascii.Error, UnicodeDecodeErrorを含む）
+            return '', ''
+
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return '', ''
+        if not isinstance(data, dict):
+            return '', ''
+    else:
+        data = request.POST
+    return str(data.get('client_id', '')), str(data.get('client_secret', ''))
+
+
+@csrf_exempt
+@require_POST
+def auth_token(request):
+    """
+    クライアント認証情報を検証し、アクセストークンを発行（クライアントアプリ用API）
+    
+    以降のAPIリクエストはトークンの署名検証のみで認証し、DynamoDBを参照しない。
+    """
+    client_id, client_secret = get_client_credentials_from_request(request)
+    if not client_id or not client_secret:
+        return JsonResponse({'error': 'invalid_request'}, status=400)
+
+    client = verify_client_credentials(client_id, client_secret)
+    if client is None:
+        return JsonResponse({'error': 'invalid_client'}, status=401)
+
+    access_token, expires_in = issue_access_token(client)
+    response = JsonResponse({
+        'access_token': access_token,
+        'token_type': 'Bearer',
+        'expires_in': expires_in,
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
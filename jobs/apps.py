@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+
+    def ready(self):
+        # 各アプリのtasks.pyを読み込み、ジョブハンドラーを登録
+        autodiscover_modules('tasks')
@@ -0,0 +1,90 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from jobs.queue import claim_jobs, get_batch_job_types, heartbeat, recover_stale_jobs, run_job_batch
+
+
+def run_jobs_in_thread(jobs):
+    """スレッドプールからジョブを実行（スレッドごとのDB接続を使い終わったら閉じる）"""
+    try:
+        return run_job_batch(jobs)
+    finally:
+        connection.close()
+
+
+def run_heartbeat(worker_name, interval, stopped):
+    """停止されるまで、実行中のジョブのlocked_atを定期的に更新（ワーカーが動いていることを示す）"""
+    try:
+        while not stopped.wait(interval):
+            try:
+                heartbeat(worker_name)
+            except Exception as e:
+                # DBの一時的な障害では停止せず、次の間隔で再試行する
+                print(f"Error updating job heartbeat ({worker_name}): {e}")
+                connection.close()
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'バックグラウンドジョブを実行するワーカーを起動します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKER_THREADS, help='同時実行数')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL, help='ジョブがない場合の待機秒数')
+        parser.add_argument('--once', action='store_true', help='実行可能なジョブを1回処理したら終了')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        worker_name = f'{socket.gethostname()}:{os.getpid()}'
+        if settings.JOB_LOCK_TIMEOUT <= settings.JOB_HEARTBEAT_INTERVAL * 2:
+            raise CommandError('JOB_LOCK_TIMEOUTはJOB_HEARTBEAT_INTERVALの2倍より長くしてください。')
+        self.stdout.write(f'ジョブワーカーを起動しました: {worker_name} (同時実行数: {workers})')
+
+        # 実行時間の長いジョブが他のワーカーに戻されないよう、別スレッドで実行中のジョブを更新し続ける
+        stopped = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=run_heartbeat,
+            args=(worker_name, settings.JOB_HEARTBEAT_INTERVAL, stopped),
+            daemon=True,
+        )
+        heartbeat_thread.start()
+        try:
+            self.run_loop(worker_name, workers, options)
+        finally:
+            stopped.set()
+            heartbeat_thread.join()
+
+    def run_loop(self, worker_name, workers, options):
+        """ジョブを取得して実行するループ"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                close_old_connections()
+                recovered = recover_stale_jobs(settings.JOB_LOCK_TIMEOUT)
+                if recovered:
+                    self.stdout.write(self.style.WARNING(f'実行中のまま残っていたジョブを{recovered}件戻しました。'))
+
+                # まとめて処理する種別は種別ごとに取得し、それ以外は1件ずつ実行する
+                batches = []
+                for job_type, batch_size in get_batch_job_types():
+                    jobs = claim_jobs(worker_name, batch_size, job_type=job_type)
+                    if jobs:
+                        batches.append(jobs)
+                batches.extend([job] for job in claim_jobs(worker_name, workers))
+
+                if batches:
+                    results = list(executor.map(run_jobs_in_thread, batches))
+                    total = sum(len(jobs) for jobs in batches)
+                    self.stdout.write(f'ジョブを{total}件実行しました（成功: {sum(results)}件）')
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
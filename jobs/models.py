@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """バックグラウンドジョブ（DBをキューとして利用）"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '待機中'),
+        (STATUS_RUNNING, '実行中'),
+        (STATUS_DONE, '完了'),
+        (STATUS_FAILED, '失敗'),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    job_type = models.CharField(max_length=100, verbose_name='ジョブ種別')
+    payload = models.JSONField(default=dict, verbose_name='パラメーター')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='状態')
+    attempts = models.IntegerField(default=0, verbose_name='実行回数')
+    max_attempts = models.IntegerField(default=5, verbose_name='最大実行回数')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='実行予定日時')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='実行開始日時')
+    locked_by = models.CharField(max_length=255, blank=True, default='', verbose_name='実行ワーカー')
+    last_error = models.TextField(blank=True, default='', verbose_name='最終エラー')
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, unique=True, verbose_name='冪等キー')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+        verbose_name = 'ジョブ'
+        verbose_name_plural = 'ジョブ'
+
+    def __str__(self):
+        return f"{self.job_type} #{self.job_id} ({self.get_status_display()})"
@@ -0,0 +1,212 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+# ジョブ種別ごとのハンドラー {job_type: (handler, on_failure, batch_size)}
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """再試行しても成功しないエラー（即座に失敗扱いにする）"""
+
+
+def register_job(job_type, on_failure=None, batch_size=None):
+    """
+    ジョブハンドラーを登録するデコレーター
+
+    Args:
+        job_type: ジョブ種別
+        on_failure: 最終的に失敗した場合に呼ばれる関数 (payload, error_message)
+        batch_size: 指定した場合、ハンドラーはパラメーターのリストを受け取り、
+            同じ種別のジョブを最大batch_size件まとめて処理する
+    """
+    def decorator(func):
+        _handlers[job_type] = (func, on_failure, batch_size)
+        return func
+    return decorator
+
+
+def get_batch_job_types():
+    """
+    まとめて処理するジョブ種別を取得
+
+    Returns:
+        list: (job_type, batch_size) のリスト
+    """
+    return [
+        (job_type, batch_size)
+        for job_type, (_, _, batch_size) in _handlers.items()
+        if batch_size
+    ]
+
+
+def enqueue(job_type, payload=None, run_at=None, max_attempts=None, idempotency_key=None):
+    """
+    ジョブを登録
+
+    呼び出し元のトランザクション内で登録されるため、コミットされるまでワーカーからは見えない。
+    idempotency_keyを指定した場合、同じキーのジョブが既にあれば新たに登録しない。
+
+    Returns:
+        Job: 登録したジョブ（同じキーのジョブが既にある場合はそのジョブ）
+    """
+    if job_type not in _handlers:
+        raise ValueError(f"Unknown job type: {job_type}")
+    values = {
+        'job_type': job_type,
+        'payload': payload or {},
+        'run_at': run_at or timezone.now(),
+        'max_attempts': max_attempts or settings.JOB_MAX_ATTEMPTS,
+    }
+    if idempotency_key is None:
+        return Job.objects.create(**values)
+    job, _ = Job.objects.get_or_create(idempotency_key=idempotency_key, defaults=values)
+    return job
+
+
+def get_retry_delay(attempts):
+    """再試行までの待機時間（指数バックオフ）"""
+    delay = settings.JOB_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.JOB_RETRY_MAX_DELAY))
+
+
+def claim_jobs(worker_name, limit, job_type=None):
+    """
+    実行可能なジョブを取得して実行中にする
+
+    SELECT ... FOR UPDATE SKIP LOCKED で取得するため、複数ワーカーが同じジョブを取得しない。
+
+    Args:
+        worker_name: ワーカー名
+        limit: 取得する最大件数
+        job_type: 指定した場合、この種別のジョブのみ取得
+
+    Returns:
+        list: 取得したジョブ
+    """
+    now = timezone.now()
+    queryset = Job.objects.select_for_update(skip_locked=True).filter(status=Job.STATUS_PENDING, run_at__lte=now)
+    if job_type is not None:
+        queryset = queryset.filter(job_type=job_type)
+    with transaction.atomic():
+        jobs = list(queryset.order_by('run_at', 'job_id')[:limit])
+        if jobs:
+            Job.objects.filter(job_id__in=[job.job_id for job in jobs]).update(
+                status=Job.STATUS_RUNNING,
+                locked_at=now,
+                locked_by=worker_name,
+            )
+            for job in jobs:
+                job.status = Job.STATUS_RUNNING
+                job.locked_at = now
+                job.locked_by = worker_name
+    return jobs
+
+
+def heartbeat(worker_name):
+    """
+    ワーカーが実行中のジョブの実行開始日時（locked_at）を現在日時に更新
+
+    ワーカーが動いている間は定期的に呼び出し、実行時間の長いジョブが
+    recover_stale_jobsで待機中に戻されて二重に実行されないようにする。
+
+    Returns:
+        int: 更新したジョブ数
+    """
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_by=worker_name).update(locked_at=timezone.now())
+
+
+def recover_stale_jobs(timeout):
+    """
+    ワーカー停止などで実行中のまま残ったジョブを待機中に戻す
+
+    実行中のジョブはワーカーがheartbeatで定期的にlocked_atを更新するため、
+    timeout秒以上更新されていないジョブのみ、ワーカーが停止したものとして戻す。
+
+    Returns:
+        int: 戻したジョブ数
+    """
+    threshold = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=threshold).update(
+        status=Job.STATUS_PENDING,
+        locked_at=None,
+        locked_by='',
+    )
+
+
+def _finish_job(job, on_failure, error=None):
+    """ジョブの実行結果に応じて状態を更新"""
+    job.locked_at = None
+    job.locked_by = ''
+    if error is None:
+        job.status = Job.STATUS_DONE
+        job.last_error = ''
+        job.save()
+        return
+
+    error_message = str(error) if isinstance(error, PermanentJobError) else f"{error.__class__.__name__}: {error}"
+    print(f"Error running job {job.job_id} ({job.job_type}): {error_message}")
+    job.last_error = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+    if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+        job.status = Job.STATUS_FAILED
+        job.save()
+        if on_failure is not None:
+            try:
+                on_failure(job.payload, error_message)
+            except Exception as failure_error:
+                print(f"Error handling job failure {job.job_id}: {failure_error}")
+    else:
+        job.status = Job.STATUS_PENDING
+        job.run_at = timezone.now() + get_retry_delay(job.attempts)
+        job.save()
+
+
+def run_job(job):
+    """
+    ジョブを実行し、結果に応じて状態を更新
+
+    失敗した場合は最大実行回数まで指数バックオフで再試行する。
+
+    Returns:
+        bool: 成功時True
+    """
+    return run_job_batch([job]) == 1
+
+
+def run_job_batch(jobs):
+    """
+    同じ種別のジョブをまとめて実行し、結果に応じて状態を更新
+
+    まとめて処理するジョブ種別はハンドラーを1回だけ呼び出し、失敗した場合は全件を再試行する。
+    それ以外の種別は1件ずつ実行する。
+
+    Returns:
+        int: 成功したジョブ数
+    """
+    handler, on_failure, batch_size = _handlers.get(jobs[0].job_type, (None, None, None))
+    if handler is not None and not batch_size and len(jobs) > 1:
+        return sum(run_job_batch([job]) for job in jobs)
+
+    for job in jobs:
+        job.attempts += 1
+    try:
+        if handler is None:
+            raise PermanentJobError(f"Unknown job type: {jobs[0].job_type}")
+        if batch_size:
+            handler([job.payload for job in jobs])
+        else:
+            handler(jobs[0].payload)
+    except Exception as e:
+        for job in jobs:
+            _finish_job(job, on_failure, e)
+        return 0
+
+    for job in jobs:
+        _finish_job(job, on_failure)
+    return len(jobs)
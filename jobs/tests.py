@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import heartbeat, recover_stale_jobs
+
+
+class RecoverStaleJobsTests(TestCase):
+    """実行中のまま残ったジョブの回復のテスト"""
+
+    def create_running_job(self, worker_name, locked_seconds_ago):
+        return Job.objects.create(
+            job_type='test',
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_name,
+            locked_at=timezone.now() - timedelta(seconds=locked_seconds_ago),
+        )
+
+    def test_jobs_of_live_worker_are_not_recovered(self):
+        """ハートビートを更新しているワーカーのジョブは、実行時間がタイムアウトを超えても戻さない"""
+        running = self.create_running_job('live:1', 1000)
+        stopped = self.create_running_job('stopped:1', 1000)
+
+        self.assertEqual(heartbeat('live:1'), 1)
+        self.assertEqual(recover_stale_jobs(900), 1)
+
+        running.refresh_from_db()
+        stopped.refresh_from_db()
+        self.assertEqual(running.status, Job.STATUS_RUNNING)
+        self.assertEqual(stopped.status, Job.STATUS_PENDING)
+        self.assertEqual(stopped.locked_by, '')
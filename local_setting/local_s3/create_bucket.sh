@@ -16,7 +16,7 @@ cat >/tmp/cors.json <<'JSON'
 [
   {
     "AllowedOrigin": ["*"],
-    "AllowedMethod": ["GET","HEAD"],
+    "AllowedMethod": ["GET","HEAD","POST"],
     "AllowedHeader": ["*"],
     "ExposeHeader": ["ETag"],
     "MaxAgeSeconds": 3000
@@ -3,6 +3,21 @@ from .models import Manual
 from applications.models import Application
 
 
+# PDFファイルの最大サイズ（50MB）
+MAX_PDF_FILE_SIZE = 50 * 1024 * 1024
+
+
+def validate_pdf_file(name, size):
+    """PDFファイル名・サイズのバリデーション"""
+    # ファイルサイズチェック (50MB以下)
+    if size > MAX_PDF_FILE_SIZE:
+        raise forms.ValidationError('ファイルサイズは50MB以下にしてください。')
+    
+    # ファイル拡張子チェック
+    if not name.lower().endswith('.pdf'):
+        raise forms.ValidationError('PDFファイルのみアップロード可能です。')
+
+
 class ManualForm(forms.ModelForm):
     """マニュアルフォーム"""
     pdf_file = forms.FileField(
@@ -26,12 +41,14 @@ class ManualForm(forms.ModelForm):
             'description': '説明',
         }
     
-    def __init__(self, *args, current_user=None, **kwargs):
+    def __init__(self, *args, current_user=None, direct_upload=False, **kwargs):
         """
         Args:
             current_user: 現在のユーザー（会社でアプリケーションをフィルタリング）
+            direct_upload: True=ファイルはブラウザからS3へ直接アップロードする（フォームでは受け取らない）
         """
         super().__init__(*args, **kwargs)
+        self.direct_upload = direct_upload
         
         if current_user:
             # 同じ会社のアプリケーションのみ表示
@@ -43,22 +60,40 @@ class ManualForm(forms.ModelForm):
         if self.instance and self.instance.pk:
             self.fields['pdf_file'].required = False
             self.fields['pdf_file'].help_text = 'ファイルを変更する場合のみ選択してください'
+        
+        # 直接アップロード時はファイルをフォームで受け取らない
+        if direct_upload:
+            self.fields['pdf_file'].required = False
     
     def clean_pdf_file(self):
         """PDFファイルのバリデーション"""
         pdf_file = self.cleaned_data.get('pdf_file')
         
-        # 新規作成時はファイル必須
-        if not self.instance.pk and not pdf_file:
+        # 新規作成時はファイル必須（直接アップロード時を除く）
+        if not self.instance.pk and not pdf_file and not self.direct_upload:
             raise forms.ValidationError('PDFファイルを選択してください。')
         
         if pdf_file:
-            # ファイルサイズチェック (50MB以下)
-            if pdf_file.size > 50 * 1024 * 1024:
-                raise forms.ValidationError('ファイルサイズは50MB以下にしてください。')
-            
-            # ファイル拡張子チェック
-            if not pdf_file.name.lower().endswith('.pdf'):
-                raise forms.ValidationError('PDFファイルのみアップロード可能です。')
+            # S3へのストリーミングに失敗したファイル（manuals.upload_handlers.S3UploadedFile）
+            upload_error = getattr(pdf_file, 'upload_error', None)
+            if upload_error:
+                raise forms.ValidationError(f'ファイルのアップロードに失敗しました: {upload_error}')
+            validate_pdf_file(pdf_file.name, pdf_file.size)
         
         return pdf_file
+
+
+class DirectUploadForm(forms.Form):
+    """S3直接アップロード用のファイル情報フォーム"""
+    file_name = forms.CharField(max_length=255)
+    file_size = forms.IntegerField(min_value=1)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        file_name = cleaned_data.get('file_name')
+        file_size = cleaned_data.get('file_size')
+        
+        if file_name and file_size:
+            validate_pdf_file(file_name, file_size)
+        
+        return cleaned_data
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min, OuterRef, Subquery
+
+from applications.models import Application
+from manuals.models import Manual
+
+
+class Command(BaseCommand):
+    help = 'マニュアルの会社ID（company_id）が未設定のレコードに、アプリケーションの会社IDを設定します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回のUPDATEで対象にするmanual_idの範囲')
+        parser.add_argument('--sleep', type=float, default=0.0, help='UPDATEごとの待機秒数（本番DBの負荷軽減用）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        targets = Manual.all_objects.filter(company__isnull=True)
+        bounds = targets.aggregate(first=Min('manual_id'), last=Max('manual_id'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS('会社IDが未設定のマニュアルはありません。'))
+            return
+
+        company_id = Subquery(
+            Application.all_objects.filter(application_id=OuterRef('application_id')).values('company_id')[:1]
+        )
+
+        # 主キーの範囲ごとに更新し、1回のUPDATEでロックする行数を抑える
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            updated += targets.filter(
+                manual_id__gte=start,
+                manual_id__lt=start + batch_size,
+            ).update(company_id=company_id)
+            self.stdout.write(f'  manual_id {start}〜{start + batch_size - 1}: 累計{updated}件')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'マニュアル{updated}件の会社IDを設定しました。'))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from manuals.models import Manual
+from manuals.views import get_preview_url_cache_key
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'マニュアルプレビューのproxyモードとredirectモードの応答時間・転送量を比較します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('manual_id', type=int, help='計測対象のマニュアルID')
+        parser.add_argument('--user-id', type=int, help='プレビューするユーザーID（省略時は同じ会社の有効なユーザー）')
+        parser.add_argument('--iterations', type=int, default=50, help='計測回数')
+
+    def handle(self, *args, **options):
+        try:
+            manual = Manual.objects.select_related('application').get(manual_id=options['manual_id'])
+        except Manual.DoesNotExist:
+            raise CommandError('マニュアルが見つかりません。')
+
+        users = User.objects.filter(company_id=manual.application.company_id, is_active=True)
+        if options['user_id']:
+            users = users.filter(user_id=options['user_id'])
+        user = users.first()
+        if user is None:
+            raise CommandError('プレビュー可能なユーザーが見つかりません。')
+
+        # 一般ユーザーとしてログインしたセッションを用意
+        client = Client()
+        session = client.session
+        session['user_id'] = user.user_id
+        session['is_user_authenticated'] = True
+        session.save()
+
+        url = reverse('manual_preview', args=[manual.manual_id])
+        iterations = options['iterations']
+
+        for mode in ('proxy', 'redirect'):
+            cache.delete(get_preview_url_cache_key(manual, user.user_id))
+            with override_settings(MANUAL_PREVIEW_DELIVERY=mode):
+                transferred = 0
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    response = client.get(url)
+                    if response.streaming:
+                        transferred += sum(len(chunk) for chunk in response.streaming_content)
+                    else:
+                        transferred += len(response.content)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{mode}: 平均 {elapsed / iterations * 1000:.2f}ms / '
+                f'アプリ経由の転送量 {transferred / iterations / 1024:.1f}KB/リクエスト'
+            )
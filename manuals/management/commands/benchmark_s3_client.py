@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from manuals.s3_utils import build_s3_client, get_s3_client
+
+
+class Command(BaseCommand):
+    help = 'S3クライアントの使い回し有無によるリクエストあたりのレイテンシを計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='計測回数')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        bucket = settings.AWS_STORAGE_BUCKET_NAME
+
+        # 毎回クライアントを生成（変更前の動作）
+        def per_call():
+            build_s3_client().head_bucket(Bucket=bucket)
+
+        # 共有クライアントを使い回す（変更後の動作）
+        def pooled():
+            get_s3_client().head_bucket(Bucket=bucket)
+
+        # 初回接続分を計測から除外
+        pooled()
+
+        for label, func in (('クライアント毎回生成', per_call), ('共有クライアント', pooled)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: 合計 {elapsed:.3f}s / 平均 {elapsed / iterations * 1000:.2f}ms'
+            )
@@ -0,0 +1,101 @@
+import random
+import statistics
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from applications.models import Application
+from companies.models import Company
+from manuals.models import Manual
+from terao_navi_web.search import paginate_search
+
+
+# 計測用のマニュアル名・説明に使う語
+WORDS = (
+    '設置', '手順', '保守', '点検', '操作', '安全', '取扱', '説明', '交換', '部品',
+    '故障', '診断', '設定', '初期化', '清掃', '配線', '更新', '確認', '警告', '注意',
+)
+# 計測する検索語（1文字の語はngramで検索できないため部分一致になる）
+DEFAULT_QUERIES = ('点検', '故障診断', '安全 設定', '第123版', '部')
+
+
+class Command(BaseCommand):
+    help = '大量のマニュアル（既定100万件）を作成し、一覧画面の検索を部分一致とFULLTEXTで比較します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='作成するマニュアルの件数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='1回のINSERTで作成する件数')
+        parser.add_argument('--iterations', type=int, default=5, help='検索語ごとの計測回数（中央値を表示）')
+        parser.add_argument('--query', action='append', dest='queries', help='計測する検索語（複数指定可）')
+        parser.add_argument('--company-id', type=int, help='作成済みの計測用データを使う場合の会社ID')
+        parser.add_argument('--keep', action='store_true', help='計測後に計測用データを削除しない')
+
+    def _seed(self, rows, batch_size):
+        """計測用の会社・アプリケーション・マニュアルを作成"""
+        company = Company.objects.create(name='検索計測用', address='-', tel='-')
+        application = Application.objects.create(company=company, application_name='検索計測用アプリ')
+        rng = random.Random(0)
+        created = 0
+        while created < rows:
+            size = min(batch_size, rows - created)
+            Manual.objects.bulk_create([
+                Manual(
+                    application=application,
+                    company=company,
+                    manual_name=f'{rng.choice(WORDS)}{rng.choice(WORDS)}マニュアル 第{created + i}版',
+                    description='、'.join(rng.sample(WORDS, 5)),
+                    file_path=f'manuals/{application.application_id}/benchmark.pdf',
+                )
+                for i in range(size)
+            ])
+            created += size
+            self.stdout.write(f'  マニュアルを作成: {created}/{rows}件')
+        return company
+
+    def _measure(self, queryset, query, iterations):
+        """先頭ページの取得時間（秒、中央値）とページ"""
+        request = RequestFactory().get('/', {'q': query})
+        durations = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            page = paginate_search(request, queryset, query)
+            durations.append(time.perf_counter() - started)
+        return statistics.median(durations), page
+
+    def handle(self, *args, **options):
+        if options['company_id']:
+            company = Company.objects.get(company_id=options['company_id'])
+        else:
+            company = self._seed(options['rows'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'計測用データを作成しました（会社ID: {company.company_id}）'))
+
+        try:
+            # インデックスは大量のINSERT後にまとめて作成する方が速い
+            if connection.vendor == 'mysql':
+                call_command('ensure_fulltext_indexes', stdout=self.stdout)
+            else:
+                self.stdout.write(self.style.WARNING('MySQL以外のため、FULLTEXTの計測も部分一致で検索されます。'))
+
+            queryset = Manual.objects.filter(company_id=company.company_id).select_related('application')
+            for query in options['queries'] or DEFAULT_QUERIES:
+                for backend in ('icontains', 'fulltext'):
+                    with override_settings(SEARCH_BACKEND=backend):
+                        elapsed, page = self._measure(queryset, query, options['iterations'])
+                    self.stdout.write(
+                        f'"{query}" {backend}: {elapsed * 1000:.1f}ms '
+                        f'({len(page)}件表示, 次ページ{"あり" if page.has_next else "なし"})'
+                    )
+        finally:
+            if not options['keep'] and not options['company_id']:
+                # 1回のDELETEでロックする行数を抑えるため、マニュアルは分割して削除する
+                manuals = Manual.all_objects.filter(company_id=company.company_id)
+                while True:
+                    ids = list(manuals.values_list('manual_id', flat=True)[:options['batch_size']])
+                    if not ids:
+                        break
+                    Manual.all_objects.filter(manual_id__in=ids).hard_delete()
+                Company.all_objects.filter(company_id=company.company_id).hard_delete()
+                self.stdout.write('計測用データを削除しました。')
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from manuals.models import ManualUploadSession
+from manuals.s3_utils import abort_multipart_upload, list_multipart_uploads
+
+
+class Command(BaseCommand):
+    help = '放置された再開可能アップロードと、未完了のS3マルチパートアップロードを中止します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='最終更新からこの時間を過ぎたアップロードを中止')
+        parser.add_argument('--dry-run', action='store_true', help='中止せずに対象のみ表示')
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(hours=options['hours'])
+        dry_run = options['dry_run']
+
+        # 1) 放置されたアップロードセッションを中止
+        sessions = ManualUploadSession.objects.filter(
+            status=ManualUploadSession.STATUS_UPLOADING,
+            updated_at__lt=threshold,
+        )
+        active_upload_ids = set(
+            ManualUploadSession.objects.filter(
+                status=ManualUploadSession.STATUS_UPLOADING,
+                updated_at__gte=threshold,
+            ).values_list('upload_id', flat=True)
+        )
+        session_count = 0
+        for upload_session in sessions.iterator():
+            self.stdout.write(f'セッションを中止: {upload_session.upload_session_id} ({upload_session.s3_key})')
+            if not dry_run:
+                try:
+                    abort_multipart_upload(upload_session.s3_key, upload_session.upload_id)
+                except Exception as e:
+                    # S3側で既に消えている場合もセッションは中止扱いにする
+                    self.stderr.write(f'マルチパートアップロードの中止に失敗しました: {e}')
+                upload_session.status = ManualUploadSession.STATUS_ABORTED
+                upload_session.save(update_fields=['status', 'updated_at'])
+            session_count += 1
+
+        # 2) セッションに紐づかない未完了のマルチパートアップロード（ストリーミングアップロードの残骸など）を中止
+        upload_count = 0
+        for upload in list_multipart_uploads():
+            if upload['Initiated'] >= threshold or upload['UploadId'] in active_upload_ids:
+                continue
+            self.stdout.write(f'マルチパートアップロードを中止: {upload["Key"]} ({upload["UploadId"]})')
+            if not dry_run:
+                try:
+                    abort_multipart_upload(upload['Key'], upload['UploadId'])
+                except Exception as e:
+                    self.stderr.write(f'マルチパートアップロードの中止に失敗しました: {e}')
+                    continue
+            upload_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'セッション{session_count}件、マルチパートアップロード{upload_count}件を中止しました。'
+        ))
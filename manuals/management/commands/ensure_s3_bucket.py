@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from manuals.s3_utils import ensure_bucket_exists
+
+
+class Command(BaseCommand):
+    help = 'マニュアル保存用のS3バケットが存在しない場合は作成します'
+
+    def handle(self, *args, **options):
+        bucket_name = settings.AWS_STORAGE_BUCKET_NAME
+        ensure_bucket_exists(bucket_name)
+        self.stdout.write(self.style.SUCCESS(f'バケットを確認しました: {bucket_name}'))
@@ -1,55 +1,163 @@
+import uuid
 from django.db import models
-from companies.models import Company
+from django.utils import timezone
+from companies.models import Company, SoftDeleteManager, SoftDeleteQuerySet
 from applications.models import Application
 
 
-class SoftDeleteManager(models.Manager):
-    """論理削除用のカスタムマネージャー"""
-    def get_queryset(self):
-        return super().get_queryset().filter(is_deleted=False)
-
-
 class Manual(models.Model):
     """マニュアルモデル"""
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_FAILED = 'failed'
+
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING_PENDING, '処理待ち'),
+        (PROCESSING_RUNNING, '処理中'),
+        (PROCESSING_READY, '公開中'),
+        (PROCESSING_FAILED, '処理失敗'),
+    ]
+
     manual_id = models.AutoField(primary_key=True)
     application = models.ForeignKey(Application, on_delete=models.CASCADE, related_name='manuals')
+    # アプリケーションの会社ID（一覧・権限チェックでapplicationsとの結合を避けるため非正規化して保持）
+    # 既存データはbackfill_manual_company_idコマンドで設定する
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='manuals',
+        verbose_name='会社',
+        db_column='company_id',
+        null=True,
+        blank=True,
+        editable=False,
+    )
     manual_name = models.CharField(max_length=200, verbose_name='マニュアル名')
     description = models.TextField(blank=True, null=True, verbose_name='説明')
     file_path = models.CharField(max_length=500, verbose_name='ファイルパス')  # S3内のパス: manuals/application_id/manual_id.pdf
     file_size = models.BigIntegerField(verbose_name='ファイルサイズ(bytes)', null=True, blank=True)
+    processing_status = models.CharField(
+        max_length=20,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PROCESSING_READY,
+        verbose_name='処理状態'
+    )
+    processing_error = models.TextField(blank=True, default='', verbose_name='処理エラー')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
     is_deleted = models.BooleanField(default=False, verbose_name='削除フラグ')
     deleted_at = models.DateTimeField(null=True, blank=True, verbose_name='削除日時')
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    # 一覧画面の検索対象（terao_navi_web.search、FULLTEXTインデックスはensure_fulltext_indexesで作成）
+    search_fields = ('manual_name', 'description', 'application__application_name')
 
     class Meta:
         db_table = 'manuals'
         indexes = [
-            models.Index(fields=['application']),
+            # 会社ごとの一覧（論理削除を除外し、作成日時の降順でキーセットページネーション）
+            models.Index(fields=['company', 'is_deleted', 'created_at', 'manual_id']),
+            # アプリケーションごとの一覧（論理削除を除外し、作成日時の降順）
+            models.Index(fields=['application', 'is_deleted', 'created_at', 'manual_id']),
             models.Index(fields=['is_deleted']),
         ]
         verbose_name = 'マニュアル'
         verbose_name_plural = 'マニュアル'
     
-    @property
-    def company(self):
-        """アプリケーションから会社を取得"""
-        return self.application.company
-    
-    @property
-    def company_id(self):
-        """アプリケーションから会社IDを取得"""
-        return self.application.company_id
-
     def __str__(self):
         return self.manual_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # アプリケーションの変更を検知するため、読み込み時のアプリケーションIDを保持
+        instance._loaded_application_id = instance.__dict__.get('application_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """保存（アプリケーションが変わった場合は会社IDも合わせる）"""
+        if self.application_id is not None and (
+            self.company_id is None or self.application_id != getattr(self, '_loaded_application_id', None)
+        ):
+            self.company_id = self.application.company_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'company' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'company']
+        super().save(*args, **kwargs)
+        self._loaded_application_id = self.application_id
+
+    @property
+    def is_ready(self):
+        """ファイルの後処理が完了しているか"""
+        return self.processing_status == self.PROCESSING_READY
+
     def delete(self, using=None, keep_parents=False):
         """論理削除"""
-        from django.utils import timezone
+        now = timezone.now()
+        Manual.all_objects.filter(pk=self.pk).soft_delete(now)
         self.is_deleted = True
-        self.deleted_at = timezone.now()
-        self.save()
+        self.deleted_at = now
+        self.updated_at = now
+
+    def restore(self):
+        """削除を取り消す"""
+        now = timezone.now()
+        Manual.all_objects.filter(pk=self.pk).restore(now)
+        self.is_deleted = False
+        self.deleted_at = None
+        self.updated_at = now
+
+
+def generate_upload_session_id():
+    """アップロードセッションIDを生成"""
+    return uuid.uuid4().hex
+
+
+class ManualUploadSession(models.Model):
+    """再開可能なマニュアルアップロードのセッション（S3マルチパートアップロードに対応）"""
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'アップロード中'),
+        (STATUS_COMPLETED, '完了'),
+        (STATUS_ABORTED, '中止'),
+    ]
+
+    upload_session_id = models.CharField(max_length=32, primary_key=True, default=generate_upload_session_id)
+    manual = models.ForeignKey(Manual, on_delete=models.CASCADE, related_name='upload_sessions')
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='manual_upload_sessions')
+    s3_key = models.CharField(max_length=500, verbose_name='ファイルパス')
+    upload_id = models.CharField(max_length=1024, verbose_name='マルチパートアップロードID')
+    file_name = models.CharField(max_length=255, verbose_name='ファイル名')
+    file_size = models.BigIntegerField(verbose_name='ファイルサイズ(bytes)')
+    chunk_size = models.BigIntegerField(verbose_name='チャンクサイズ(bytes)')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_UPLOADING, verbose_name='状態')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
+
+    class Meta:
+        db_table = 'manual_upload_sessions'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+        verbose_name = 'マニュアルアップロードセッション'
+        verbose_name_plural = 'マニュアルアップロードセッション'
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+    @property
+    def total_chunks(self):
+        """チャンク数"""
+        return max(1, -(-self.file_size // self.chunk_size))
+
+    def expected_chunk_length(self, index):
+        """指定したチャンクのサイズ（最後のチャンクのみ端数）"""
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.file_size - self.chunk_size * (self.total_chunks - 1)
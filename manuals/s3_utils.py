@@ -1,42 +1,114 @@
+import os
+import threading
+
 import boto3
 from botocore.exceptions import ClientError
 from botocore.config import Config
 from django.conf import settings
+from django.core.cache import cache
 
 
-def get_s3_client():
-    """S3クライアントを取得"""
+# プロセス内で共有するS3クライアント（boto3のクライアントはスレッドセーフ）
+_s3_client = None
+_s3_client_pid = None
+_s3_client_lock = threading.Lock()
+
+# 存在を確認済みのバケット名
+_confirmed_buckets = set()
+
+
+def build_s3_client():
+    """S3クライアントを新規に生成（接続プール・タイムアウトは設定値から取得）"""
     # boto3のセッションを作成
     session = boto3.session.Session()
-    
+
     return session.client(
         's3',
         endpoint_url=settings.AWS_S3_ENDPOINT_URL,
         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version='s3v4'),
+        config=Config(
+            signature_version=settings.AWS_S3_SIGNATURE_VERSION,
+            max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.AWS_S3_CONNECT_TIMEOUT,
+            read_timeout=settings.AWS_S3_READ_TIMEOUT,
+            tcp_keepalive=settings.AWS_S3_TCP_KEEPALIVE,
+        ),
         region_name=settings.AWS_S3_REGION_NAME,
         use_ssl=settings.AWS_S3_USE_SSL,
     )
 
 
-def ensure_bucket_exists():
-    """バケットが存在しない場合は作成"""
+def get_s3_client():
+    """
+    S3クライアントを取得
+
+    初回呼び出し時にのみ生成し、以降は同じプロセス内で使い回す。
+    fork後の子プロセスでは親の接続を共有しないよう作り直す。
+    """
+    global _s3_client, _s3_client_pid
+
+    pid = os.getpid()
+    if _s3_client is None or _s3_client_pid != pid:
+        with _s3_client_lock:
+            if _s3_client is None or _s3_client_pid != pid:
+                _s3_client = build_s3_client()
+                _s3_client_pid = pid
+    return _s3_client
+
+
+def reset_s3_client():
+    """共有S3クライアントを破棄（設定変更時やテスト用）"""
+    global _s3_client, _s3_client_pid
+    with _s3_client_lock:
+        _s3_client = None
+        _s3_client_pid = None
+
+
+def _is_no_such_bucket(error):
+    """ClientErrorがバケット未作成によるものか判定"""
+    return error.response.get('Error', {}).get('Code') in ('NoSuchBucket', '404')
+
+
+def ensure_bucket_exists(bucket_name=None):
+    """
+    バケットが存在しない場合は作成
+
+    確認済みのバケットはプロセス内で記憶し、以降はS3へ問い合わせない。
+    """
+    bucket_name = bucket_name or settings.AWS_STORAGE_BUCKET_NAME
+    if bucket_name in _confirmed_buckets:
+        return
+
     s3_client = get_s3_client()
     try:
-        s3_client.head_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+        s3_client.head_bucket(Bucket=bucket_name)
     except ClientError:
         # バケットが存在しない場合は作成
         try:
-            s3_client.create_bucket(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
+            s3_client.create_bucket(Bucket=bucket_name)
         except ClientError as e:
             print(f"Error creating bucket: {e}")
             raise
+    _confirmed_buckets.add(bucket_name)
+
+
+def forget_bucket(bucket_name=None):
+    """確認済みバケットの記憶を破棄"""
+    _confirmed_buckets.discard(bucket_name or settings.AWS_STORAGE_BUCKET_NAME)
+
+
+def build_s3_key(application_id, filename):
+    """S3内のパスを生成: application_id/filename (バケット名がmanualsなので、パスにmanualsは不要)"""
+    return f"{application_id}/{filename}"
 
 
 def upload_file_to_s3(file, company_id, application_id, filename):
     """
     ファイルをS3にアップロード
+
+    バケットは起動時（ensure_s3_bucketコマンド）に作成済みである前提でアップロードし、
+    NoSuchBucketで失敗した場合のみバケットを作成して1度だけ再試行する。
     
     Args:
         file: アップロードするファイルオブジェクト
@@ -47,19 +119,30 @@ def upload_file_to_s3(file, company_id, application_id, filename):
     Returns:
         str: S3内のファイルパス
     """
-    ensure_bucket_exists()
-    
-    # S3内のパスを生成: application_id/filename (バケット名がmanualsなので、パスにmanualsは不要)
-    s3_key = f"{application_id}/{filename}"
+    s3_key = build_s3_key(application_id, filename)
     
     s3_client = get_s3_client()
     try:
-        s3_client.upload_fileobj(
-            file,
-            settings.AWS_STORAGE_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={'ContentType': 'application/pdf'}
-        )
+        try:
+            s3_client.upload_fileobj(
+                file,
+                settings.AWS_STORAGE_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={'ContentType': 'application/pdf'}
+            )
+        except ClientError as e:
+            if not _is_no_such_bucket(e) or not file.seekable():
+                raise
+            # バケットが削除されていた場合は記憶を破棄して作り直す
+            forget_bucket()
+            ensure_bucket_exists()
+            file.seek(0)
+            s3_client.upload_fileobj(
+                file,
+                settings.AWS_STORAGE_BUCKET_NAME,
+                s3_key,
+                ExtraArgs={'ContentType': 'application/pdf'}
+            )
         return s3_key
     except ClientError as e:
         print(f"Error uploading file: {e}")
@@ -88,6 +171,274 @@ def download_file_from_s3(s3_key):
         raise
 
 
+def create_multipart_upload(s3_key):
+    """
+    マルチパートアップロードを開始
+    
+    Args:
+        s3_key: S3内のファイルパス
+    
+    Returns:
+        str: アップロードID
+    """
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.create_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            ContentType='application/pdf'
+        )
+        return response['UploadId']
+    except ClientError as e:
+        print(f"Error creating multipart upload: {e}")
+        raise
+
+
+def upload_part(s3_key, upload_id, part_number, body):
+    """
+    マルチパートアップロードのパートを送信
+    
+    Args:
+        s3_key: S3内のファイルパス
+        upload_id: アップロードID
+        part_number: パート番号（1始まり）
+        body: パートの内容
+    
+    Returns:
+        dict: {'PartNumber': パート番号, 'ETag': ETag}
+    """
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.upload_part(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+    except ClientError as e:
+        print(f"Error uploading part: {e}")
+        raise
+
+
+def complete_multipart_upload(s3_key, upload_id, parts):
+    """
+    マルチパートアップロードを完了
+    
+    Args:
+        s3_key: S3内のファイルパス
+        upload_id: アップロードID
+        parts: upload_partの戻り値のリスト
+    """
+    s3_client = get_s3_client()
+    try:
+        s3_client.complete_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [
+                {'PartNumber': part['PartNumber'], 'ETag': part['ETag']}
+                for part in sorted(parts, key=lambda part: part['PartNumber'])
+            ]}
+        )
+    except ClientError as e:
+        print(f"Error completing multipart upload: {e}")
+        raise
+
+
+def abort_multipart_upload(s3_key, upload_id):
+    """
+    マルチパートアップロードを中止（アップロード済みのパートも破棄される）
+    
+    Args:
+        s3_key: S3内のファイルパス
+        upload_id: アップロードID
+    """
+    s3_client = get_s3_client()
+    try:
+        s3_client.abort_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id
+        )
+    except ClientError as e:
+        print(f"Error aborting multipart upload: {e}")
+        raise
+
+
+def list_uploaded_parts(s3_key, upload_id):
+    """
+    マルチパートアップロードの送信済みパートを取得
+    
+    Args:
+        s3_key: S3内のファイルパス
+        upload_id: アップロードID
+    
+    Returns:
+        list: [{'PartNumber': パート番号, 'ETag': ETag, 'Size': サイズ}, ...]
+    """
+    s3_client = get_s3_client()
+    try:
+        parts = []
+        paginator = s3_client.get_paginator('list_parts')
+        for page in paginator.paginate(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id
+        ):
+            for part in page.get('Parts', []):
+                parts.append({'PartNumber': part['PartNumber'], 'ETag': part['ETag'], 'Size': part['Size']})
+        return parts
+    except ClientError as e:
+        print(f"Error listing parts: {e}")
+        raise
+
+
+def list_multipart_uploads():
+    """
+    バケット内の未完了のマルチパートアップロードを取得
+    
+    Returns:
+        list: [{'Key': ファイルパス, 'UploadId': アップロードID, 'Initiated': 開始日時}, ...]
+    """
+    s3_client = get_s3_client()
+    try:
+        uploads = []
+        paginator = s3_client.get_paginator('list_multipart_uploads')
+        for page in paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME):
+            for upload in page.get('Uploads', []):
+                uploads.append({'Key': upload['Key'], 'UploadId': upload['UploadId'], 'Initiated': upload['Initiated']})
+        return uploads
+    except ClientError as e:
+        print(f"Error listing multipart uploads: {e}")
+        raise
+
+
+def move_file_in_s3(src_key, dst_key):
+    """
+    S3内でファイルを移動（サーバー側コピー後に元ファイルを削除）
+    
+    Args:
+        src_key: 移動元のファイルパス
+        dst_key: 移動先のファイルパス
+    
+    Returns:
+        str: 移動先のファイルパス
+    """
+    s3_client = get_s3_client()
+    try:
+        s3_client.copy_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=dst_key,
+            CopySource={'Bucket': settings.AWS_STORAGE_BUCKET_NAME, 'Key': src_key},
+            ContentType='application/pdf',
+            MetadataDirective='REPLACE'
+        )
+        s3_client.delete_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=src_key
+        )
+        return dst_key
+    except ClientError as e:
+        print(f"Error moving file: {e}")
+        raise
+
+
+def generate_presigned_upload(s3_key, max_size, expiration=600):
+    """
+    ブラウザからS3へ直接アップロードするための署名付きPOSTを生成
+    
+    アップロード先のキー・Content-Type（application/pdf）・最大サイズをポリシーで制限する。
+    
+    Args:
+        s3_key: S3内のファイルパス
+        max_size: 最大ファイルサイズ（bytes）
+        expiration: 有効期限（秒）
+    
+    Returns:
+        dict: {'url': POST先URL, 'fields': フォームに含めるフィールド}
+    """
+    s3_client = get_s3_client()
+    try:
+        return s3_client.generate_presigned_post(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key,
+            Fields={'Content-Type': 'application/pdf'},
+            Conditions=[
+                {'Content-Type': 'application/pdf'},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expiration
+        )
+    except ClientError as e:
+        print(f"Error generating presigned POST: {e}")
+        raise
+
+
+def head_file(s3_key):
+    """
+    S3ファイルのメタデータを取得
+    
+    Args:
+        s3_key: S3内のファイルパス
+    
+    Returns:
+        dict or None: head_objectのレスポンス、ファイルが存在しない場合None
+    """
+    s3_client = get_s3_client()
+    try:
+        return s3_client.head_object(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=s3_key
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        print(f"Error getting file metadata: {e}")
+        raise
+
+
+def open_file_stream(s3_key, byte_range=None):
+    """
+    S3のファイルをストリームとして取得（本文は読み込まない）
+    
+    Args:
+        s3_key: S3内のファイルパス
+        byte_range: HTTPのRangeヘッダー値（例: "bytes=0-1023"）。Noneの場合はファイル全体
+    
+    Returns:
+        dict: get_objectのレスポンス（Body, ContentLength, ContentRange等）
+    """
+    s3_client = get_s3_client()
+    params = {
+        'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+        'Key': s3_key,
+    }
+    if byte_range:
+        params['Range'] = byte_range
+    try:
+        return s3_client.get_object(**params)
+    except ClientError as e:
+        print(f"Error opening file stream: {e}")
+        raise
+
+
+def iter_file_stream(body, chunk_size):
+    """
+    S3のレスポンス本文を固定サイズのチャンクで返す（終了時に接続を解放）
+    
+    Args:
+        body: get_objectのBody（StreamingBody）
+        chunk_size: チャンクサイズ（bytes）
+    """
+    try:
+        for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
 def delete_file_from_s3(s3_key):
     """
     S3からファイルを削除
@@ -106,28 +457,59 @@ def delete_file_from_s3(s3_key):
         raise
 
 
-def get_file_url(s3_key, expiration=3600):
+def get_file_url(s3_key, expiration=3600, response_params=None):
     """
     S3ファイルの署名付きURLを生成
     
     Args:
         s3_key: S3内のファイルパス
         expiration: URL有効期限（秒）
+        response_params: レスポンスヘッダーの上書き（例: {'ResponseContentType': 'application/pdf'}）
     
     Returns:
         str: 署名付きURL
     """
     s3_client = get_s3_client()
+    params = {
+        'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+        'Key': s3_key
+    }
+    if response_params:
+        params.update(response_params)
     try:
         url = s3_client.generate_presigned_url(
             'get_object',
-            Params={
-                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                'Key': s3_key
-            },
+            Params=params,
             ExpiresIn=expiration
         )
         return url
     except ClientError as e:
         print(f"Error generating presigned URL: {e}")
         raise
+
+
+def get_cached_file_url(s3_key, cache_key, expiration, cache_ratio=0.5, response_params=None):
+    """
+    署名付きURLをキャッシュから取得（なければ生成してキャッシュ）
+    
+    有効期限切れ間近のURLを返さないよう、有効期限のcache_ratio分だけキャッシュする。
+    
+    Args:
+        s3_key: S3内のファイルパス
+        cache_key: キャッシュキー
+        expiration: URL有効期限（秒）
+        cache_ratio: 有効期限に対するキャッシュ期間の割合
+        response_params: レスポンスヘッダーの上書き
+    
+    Returns:
+        str: 署名付きURL
+    """
+    url = cache.get(cache_key)
+    if url:
+        return url
+    
+    url = get_file_url(s3_key, expiration, response_params)
+    timeout = int(expiration * cache_ratio)
+    if timeout > 0:
+        cache.set(cache_key, url, timeout)
+    return url
@@ -0,0 +1,104 @@
+from botocore.exceptions import ClientError
+
+from jobs.queue import PermanentJobError, register_job
+from .forms import MAX_PDF_FILE_SIZE
+from .models import Manual
+from .s3_utils import (
+    complete_multipart_upload,
+    delete_file_from_s3,
+    head_file,
+    move_file_in_s3,
+    open_file_stream,
+)
+
+
+# PDFのヘッダーを探す範囲（先頭1024バイト以内にあればよい）
+PDF_HEADER_RANGE = 'bytes=0-1023'
+
+
+def mark_processing_failed(payload, error_message):
+    """後処理が最終的に失敗した場合にマニュアルへ記録"""
+    Manual.all_objects.filter(manual_id=payload['manual_id']).update(
+        processing_status=Manual.PROCESSING_FAILED,
+        processing_error=error_message,
+    )
+
+
+def finalize_staged_upload(staging_key, upload_id, parts, s3_key):
+    """
+    一時パスへのマルチパートアップロードを完了し、正式なパスへ移動
+
+    再試行時は完了済み・移動済みの工程を飛ばす。
+    """
+    try:
+        complete_multipart_upload(staging_key, upload_id, parts)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+            raise
+        # 前回の実行で完了済み
+        if head_file(staging_key) is None:
+            if head_file(s3_key) is None:
+                raise PermanentJobError('アップロードされたファイルが見つかりません。')
+            return
+
+    move_file_in_s3(staging_key, s3_key)
+
+
+def validate_pdf(s3_key):
+    """
+    S3上のファイルがPDFか検証
+
+    Returns:
+        dict: head_objectのレスポンス
+    """
+    head = head_file(s3_key)
+    if head is None:
+        raise PermanentJobError('ファイルが見つかりません。')
+    if head['ContentLength'] > MAX_PDF_FILE_SIZE:
+        raise PermanentJobError('ファイルサイズは50MB以下にしてください。')
+
+    response = open_file_stream(s3_key, PDF_HEADER_RANGE)
+    try:
+        header = response['Body'].read()
+    finally:
+        response['Body'].close()
+    if b'%PDF-' not in header:
+        raise PermanentJobError('PDFファイルではありません。')
+
+    return head
+
+
+@register_job('manuals.process_upload', on_failure=mark_processing_failed)
+def process_manual_upload(payload):
+    """
+    アップロードされたマニュアルの後処理
+
+    payload:
+        manual_id: マニュアルID
+        s3_key: 正式なファイルパス
+        staging_key / upload_id / parts: 未完了のマルチパートアップロード（ストリーミングアップロード時のみ）
+        old_file_path: 置き換え前のファイルパス（編集時のみ）
+    """
+    manual_id = payload['manual_id']
+    s3_key = payload['s3_key']
+    Manual.all_objects.filter(manual_id=manual_id).update(processing_status=Manual.PROCESSING_RUNNING)
+
+    # 1) アップロードの確定
+    if payload.get('upload_id'):
+        finalize_staged_upload(payload['staging_key'], payload['upload_id'], payload['parts'], s3_key)
+
+    # 2) 検証と派生情報（実際のファイルサイズ）の記録
+    head = validate_pdf(s3_key)
+    Manual.all_objects.filter(manual_id=manual_id).update(
+        file_size=head['ContentLength'],
+        processing_status=Manual.PROCESSING_READY,
+        processing_error='',
+    )
+
+    # 3) 保存先が変わった場合は古いファイルを削除（検証に失敗した場合は残す）
+    old_file_path = payload.get('old_file_path')
+    if old_file_path and old_file_path != s3_key:
+        try:
+            delete_file_from_s3(old_file_path)
+        except Exception:
+            pass  # 削除失敗しても続行
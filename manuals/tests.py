@@ -1,3 +1,280 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from applications.models import Application
+from companies.models import Company
+from jobs.queue import PermanentJobError
+from terao_navi_web.search import search
+from users.models import Role, User
+from .models import Manual
+from .tasks import process_manual_upload
+
+
+class ProcessManualUploadTests(TestCase):
+    """アップロード後処理ジョブのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        application = Application.objects.create(company=company, application_name='アプリ')
+        cls.manual = Manual.objects.create(
+            application=application,
+            manual_name='マニュアル',
+            file_path='manuals/1/new.pdf',
+            processing_status=Manual.PROCESSING_PENDING,
+        )
+
+    def setUp(self):
+        # S3を差し替える（ファイルサイズとPDFヘッダーはテストごとに設定）
+        self.body = mock.Mock()
+        patches = {
+            'head_file': mock.patch('manuals.tasks.head_file', return_value={'ContentLength': 1024}),
+            'open_file_stream': mock.patch('manuals.tasks.open_file_stream', return_value={'Body': self.body}),
+            'delete_file_from_s3': mock.patch('manuals.tasks.delete_file_from_s3'),
+        }
+        for name, patcher in patches.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def run_job(self, header):
+        """編集時（保存先の変更あり）の後処理を実行"""
+        self.body.read.return_value = header
+        process_manual_upload({
+            'manual_id': self.manual.manual_id,
+            's3_key': 'manuals/1/new.pdf',
+            'old_file_path': 'manuals/1/old.pdf',
+        })
+
+    def test_old_file_deleted_after_validation(self):
+        """検証に成功した場合のみ古いファイルを削除"""
+        self.run_job(b'%PDF-1.7')
+
+        self.delete_file_from_s3.assert_called_once_with('manuals/1/old.pdf')
+        self.manual.refresh_from_db()
+        self.assertEqual(self.manual.processing_status, Manual.PROCESSING_READY)
+        self.assertEqual(self.manual.file_size, 1024)
+
+    def test_old_file_kept_when_validation_fails(self):
+        """PDFでないファイルの場合は古いファイルを残す"""
+        with self.assertRaises(PermanentJobError):
+            self.run_job(b'<html>')
+
+        self.delete_file_from_s3.assert_not_called()
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    MANUAL_PREVIEW_RATE_LIMIT_PER_USER='2/60',
+    MANUAL_PREVIEW_RATE_LIMIT_PER_COMPANY='',
+    MANUAL_PREVIEW_DELIVERY='stream',
+)
+class ManualPreviewRateLimitTests(TestCase):
+    """プレビューのレート制限のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        application = Application.objects.create(company=company, application_name='アプリ')
+        cls.user = User.objects.create(company=company, username='user', email='user@example.com', password='x')
+        cls.manual = Manual.objects.create(
+            application=application,
+            company=company,
+            manual_name='マニュアル',
+            file_path='manuals/1/manual.pdf',
+            file_size=4 * 65536,
+        )
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session.update({'is_user_authenticated': True, 'user_id': self.user.user_id})
+        session.save()
+        patcher = mock.patch('manuals.views.open_file_stream', side_effect=self.open_file_stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_file_stream(self, key, byte_range=None):
+        """S3の応答（Range指定の場合は部分応答）"""
+        body = mock.Mock()
+        body.iter_chunks.return_value = iter([b'%PDF-1.7'])
+        response = {'Body': body, 'ContentLength': 8}
+        if byte_range:
+            response['ContentRange'] = f'{byte_range.replace("=", " ")}/{self.manual.file_size}'
+        return response
+
+    def preview(self, **headers):
+        return self.client.get(reverse('manual_preview', args=[self.manual.manual_id]), **headers)
+
+    def test_range_requests_are_not_throttled(self):
+        """1回目の表示以降、PDFビューアーの分割取得は制限に数えない"""
+        self.assertEqual(self.preview().status_code, 200)
+        for start in range(0, self.manual.file_size, 65536):
+            response = self.preview(HTTP_RANGE=f'bytes={start}-{start + 65535}')
+            self.assertEqual(response.status_code, 206)
+
+        # 残りのトークンは1つ（分割取得で消費されていない）
+        self.assertEqual(self.preview().status_code, 200)
+        self.assertEqual(self.preview().status_code, 429)
+
+
+@override_settings(MANUAL_STREAMING_UPLOAD=True, MANUAL_MULTIPART_PART_SIZE=1024)
+class StreamingUploadFailureTests(TestCase):
+    """S3へのストリーミングアップロードに失敗した場合のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.FULL_ACCESS, defaults={'name': '全権限'})
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        cls.application = Application.objects.create(company=company, application_name='アプリ')
+        cls.user = User.objects.create(
+            company=company, username='user', email='user@example.com', password='x', role_id=Role.FULL_ACCESS,
+        )
+
+    def setUp(self):
+        session = self.client.session
+        session.update({'is_user_authenticated': True, 'user_id': self.user.user_id})
+        session.save()
+        patches = {
+            'create_multipart_upload': mock.patch(
+                'manuals.upload_handlers.create_multipart_upload', return_value='upload-id',
+            ),
+            'upload_part': mock.patch(
+                'manuals.upload_handlers.upload_part', side_effect=RuntimeError('S3 unavailable'),
+            ),
+            'abort_multipart_upload': mock.patch('manuals.upload_handlers.abort_multipart_upload'),
+        }
+        for name, patcher in patches.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_part_failure_is_reported_as_form_error(self):
+        """パートの送信に失敗した場合は500にせず、フォームのエラーとして表示する"""
+        pdf = SimpleUploadedFile('manual.pdf', b'%PDF-1.7\n' + b'0' * 4096, content_type='application/pdf')
+        response = self.client.post(reverse('manual_create'), {
+            'application': self.application.application_id,
+            'manual_name': 'マニュアル',
+            'description': '',
+            'pdf_file': pdf,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ファイルのアップロードに失敗しました', response.context['form'].errors['pdf_file'][0])
+        self.abort_multipart_upload.assert_called_with(mock.ANY, 'upload-id')
+        self.assertFalse(Manual.objects.filter(manual_name='マニュアル').exists())
+
+
+@override_settings(MANUAL_PREVIEW_DELIVERY='redirect', RATE_LIMIT_ENABLED=False)
+class ManualPreviewRedirectTests(TestCase):
+    """プレビューのリダイレクトモードのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        application = Application.objects.create(company=company, application_name='アプリ')
+        cls.user = User.objects.create(company=company, username='user', email='user@example.com', password='x')
+        cls.manual = Manual.objects.create(
+            application=application,
+            company=company,
+            manual_name='マニュアル',
+            file_path='manuals/1/manual.pdf',
+        )
+
+    def setUp(self):
+        cache.clear()
+        session = self.client.session
+        session.update({'is_user_authenticated': True, 'user_id': self.user.user_id})
+        session.save()
+        patcher = mock.patch('manuals.s3_utils.get_file_url', side_effect=lambda key, *args: f'https://s3.example.com/{key}')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached_url_follows_moved_file(self):
+        """編集でファイルの保存先が変わった場合はキャッシュした古いURLを返さない"""
+        url = reverse('manual_preview', args=[self.manual.manual_id])
+        self.assertEqual(self.client.get(url)['Location'], 'https://s3.example.com/manuals/1/manual.pdf')
+
+        Manual.objects.filter(pk=self.manual.pk).update(file_path='manuals/2/manual.pdf')
+        self.assertEqual(self.client.get(url)['Location'], 'https://s3.example.com/manuals/2/manual.pdf')
+
+
+class ManualSearchTests(TransactionTestCase):
+    """マニュアル一覧の検索のテスト（MySQLのFULLTEXTインデックスは未コミットの行を検索できないため、トランザクションを使わない）"""
+
+    def setUp(self):
+        if connection.vendor == 'mysql':
+            call_command('ensure_fulltext_indexes', stdout=StringIO())
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        application = Application.objects.create(company=company, application_name='保守点検アプリ')
+        other = Application.objects.create(company=company, application_name='受付アプリ')
+        self.manual = Manual.objects.create(
+            application=application, company=company, manual_name='設置手順書', file_path='manuals/1/1.pdf',
+        )
+        Manual.objects.create(application=other, company=company, manual_name='設置手順書', file_path='manuals/2/2.pdf')
+        Manual.objects.create(application=application, company=company, manual_name='操作説明書', file_path='manuals/1/3.pdf')
+
+    def test_terms_split_across_manual_and_application(self):
+        """語がマニュアル名とアプリケーション名に分かれていても、すべての語を含むマニュアルが見つかる"""
+        for backend in ('fulltext', 'icontains'):
+            with self.subTest(backend=backend), override_settings(SEARCH_BACKEND=backend):
+                queryset, _ = search(Manual.objects.all(), '設置 保守')
+                self.assertEqual(list(queryset.values_list('manual_id', flat=True)), [self.manual.manual_id])
+
+
+class ManualUploadCompleteTests(TestCase):
+    """S3直接アップロードの完了通知のテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.FULL_ACCESS, defaults={'name': '全権限'})
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        cls.application = Application.objects.create(company=company, application_name='アプリ')
+        cls.user = User.objects.create(
+            company=company, username='user', email='user@example.com', password='x', role_id=Role.FULL_ACCESS,
+        )
+
+    def setUp(self):
+        session = self.client.session
+        session.update({'is_user_authenticated': True, 'user_id': self.user.user_id})
+        session.save()
+        patches = {
+            'head_file': mock.patch(
+                'manuals.views.head_file', return_value={'ContentType': 'text/html', 'ContentLength': 1024},
+            ),
+            'delete_file_from_s3': mock.patch('manuals.views.delete_file_from_s3'),
+        }
+        for name, patcher in patches.items():
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def create_manual(self, file_path):
+        manual = Manual.objects.create(
+            application=self.application, company=self.application.company, manual_name='マニュアル', file_path='',
+        )
+        Manual.objects.filter(pk=manual.pk).update(file_path=file_path.format(manual_id=manual.manual_id))
+        return manual
+
+    def complete(self, manual):
+        return self.client.post(reverse('manual_upload_complete', args=[manual.manual_id]))
+
+    def test_current_file_is_kept_when_validation_fails(self):
+        """アップロード先が現在のファイルと同じ場合は、検証に失敗しても削除しない"""
+        manual = self.create_manual(f'{self.application.application_id}/{{manual_id}}.pdf')
+
+        self.assertEqual(self.complete(manual).status_code, 400)
+        self.delete_file_from_s3.assert_not_called()
+
+    def test_new_upload_is_deleted_when_validation_fails(self):
+        """現在のファイルと別の保存先にアップロードされたファイルは、検証に失敗した場合に削除する"""
+        manual = self.create_manual('0/{manual_id}.pdf')
+
+        self.assertEqual(self.complete(manual).status_code, 400)
+        self.delete_file_from_s3.assert_called_once_with(f'{self.application.application_id}/{manual.manual_id}.pdf')
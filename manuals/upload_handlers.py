@@ -0,0 +1,242 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from users.middleware import get_current_user
+from users.models import Role
+from .forms import MAX_PDF_FILE_SIZE
+from .s3_utils import (
+    create_multipart_upload,
+    upload_part,
+    complete_multipart_upload,
+    abort_multipart_upload,
+)
+
+
+# 一時アップロード先のプレフィックス（フォーム検証後に正式なパスへ移動する）
+STAGING_PREFIX = 'uploads/'
+
+
+class S3UploadedFile(UploadedFile):
+    """
+    S3のマルチパートアップロードへ送信済みのファイル
+
+    全パートの送信後も完了させずに保持し、フォーム検証に通った場合のみcommit()で完了させる。
+    検証に失敗した場合はdiscard()でマルチパートアップロードを中止する。
+    S3への送信に失敗した場合はupload_errorにエラー内容を設定する（フォーム検証でエラーにする）。
+    """
+
+    def __init__(self, s3_key, upload_id, parts, name, content_type, size, charset=None, content_type_extra=None,
+                 upload_error=None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.s3_key = s3_key
+        self.upload_id = upload_id
+        self.parts = parts
+        self.upload_error = upload_error
+
+    def commit(self):
+        """
+        マルチパートアップロードを完了
+        
+        Returns:
+            str: S3内の一時ファイルパス
+        """
+        complete_multipart_upload(self.s3_key, self.upload_id, self.parts)
+        self.upload_id = None
+        return self.s3_key
+
+    def detach(self):
+        """
+        マルチパートアップロードの完了をバックグラウンドジョブに引き継ぐ
+        
+        Returns:
+            dict: マルチパートアップロードの情報（ジョブのパラメーター）
+        """
+        state = {'staging_key': self.s3_key, 'upload_id': self.upload_id, 'parts': self.parts}
+        self.upload_id = None
+        return state
+
+    def discard(self):
+        """マルチパートアップロードを中止"""
+        if self.upload_id:
+            try:
+                abort_multipart_upload(self.s3_key, self.upload_id)
+            except Exception:
+                pass  # 中止に失敗しても続行（未完了のアップロードは後から削除する）
+            self.upload_id = None
+
+
+class S3MultipartUploadHandler(FileUploadHandler):
+    """
+    PDFファイルをリクエストの受信と並行してS3のマルチパートアップロードへ流すハンドラー
+
+    受信したデータをパートサイズごとにスレッドプールから並列送信するため、
+    ファイルをディスクやメモリに溜め込まない。送信中のパート数は同時実行数までに制限する。
+    """
+
+    def __init__(self, request=None, field_name='pdf_file'):
+        super().__init__(request)
+        self.target_field_name = field_name
+        self.part_size = settings.MANUAL_MULTIPART_PART_SIZE
+        self.concurrency = settings.MANUAL_MULTIPART_CONCURRENCY
+        self.active = False
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        # 対象フィールドのPDFファイルのみ扱い、それ以外は後続のハンドラーに任せる
+        self.active = field_name == self.target_field_name and file_name.lower().endswith('.pdf')
+        if not self.active:
+            return
+
+        self.s3_key = f"{STAGING_PREFIX}{uuid.uuid4().hex}.pdf"
+        self.upload_id = None
+        self.buffer = bytearray()
+        self.received = 0
+        self.part_number = 0
+        self.futures = []
+        self.too_large = False
+        self.error = None
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        self.received += len(raw_data)
+        # サイズ上限を超えた場合・送信に失敗した場合は送信を中止し、サイズのみ数え続ける（フォーム検証でエラーにする）
+        if self.received > MAX_PDF_FILE_SIZE:
+            if not self.too_large:
+                self.too_large = True
+                self._abort()
+            return None
+        if self.error is not None:
+            return None
+
+        self.buffer.extend(raw_data)
+        try:
+            while len(self.buffer) >= self.part_size:
+                self._submit_part(bytes(self.buffer[:self.part_size]))
+                del self.buffer[:self.part_size]
+        except Exception as e:
+            self._fail(e)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+
+        self.active = False
+        if self.too_large or self.received == 0:
+            # 空ファイル・サイズ超過はS3に残さず、サイズだけをフォームに渡す
+            self._abort()
+            return S3UploadedFile(None, None, [], self.file_name, self.content_type, self.received)
+
+        # 全パートの送信を待つ（完了はフォーム検証後にビューで行う）
+        if self.error is None:
+            try:
+                if self.buffer:
+                    self._submit_part(bytes(self.buffer))
+                    self.buffer = bytearray()
+                parts = [future.result() for future in self.futures]
+            except Exception as e:
+                self._fail(e)
+            finally:
+                self.executor.shutdown(wait=True)
+
+        if self.error is not None:
+            # S3の障害・権限エラー等はリクエストの解析中に例外にせず、フォームのエラーとして表示する
+            return S3UploadedFile(
+                None, None, [], self.file_name, self.content_type, self.received,
+                upload_error=f'{self.error.__class__.__name__}: {self.error}',
+            )
+
+        return S3UploadedFile(
+            self.s3_key,
+            self.upload_id,
+            parts,
+            self.file_name,
+            self.content_type,
+            self.received,
+            self.charset,
+            self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self.active:
+            self.active = False
+            self._abort()
+
+    def _submit_part(self, body):
+        """パートをスレッドプールへ送信（送信中のパート数が上限に達している場合は待機）"""
+        if self.upload_id is None:
+            self.upload_id = create_multipart_upload(self.s3_key)
+        self.part_number += 1
+        self.slots.acquire()
+        future = self.executor.submit(upload_part, self.s3_key, self.upload_id, self.part_number, body)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+    def _fail(self, error):
+        """S3への送信に失敗した場合はマルチパートアップロードを中止し、エラーを記録"""
+        print(f"Error streaming upload to S3 ({self.s3_key}): {error}")
+        self.error = error
+        self._abort()
+
+    def _abort(self):
+        """送信中のパートを待ってからマルチパートアップロードを中止"""
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        self.futures = []
+        if self.upload_id is not None:
+            try:
+                abort_multipart_upload(self.s3_key, self.upload_id)
+            except Exception:
+                pass  # 中止に失敗しても続行（未完了のアップロードは後から削除する）
+            self.upload_id = None
+        self.buffer = bytearray()
+
+
+def can_stream_upload(request):
+    """S3へのストリーミングを許可するか（ログイン済みで、閲覧権限のみのユーザーではない）"""
+    if not request.session.get('is_user_authenticated'):
+        return False
+    current_user = get_current_user(request)
+    return current_user is not None and current_user.role_id != Role.READ_ONLY
+
+
+def stream_pdf_upload_to_s3(view_func):
+    """
+    POSTされたPDFをS3マルチパートアップロードへ直接流すデコレーター
+
+    アップロードハンドラーはrequest.POSTを読む前に差し替える必要があるため、
+    CSRF検証はハンドラー設定後にビュー内で行う。ビューが保存しなかったファイルは
+    マルチパートアップロードを中止する。
+    CSRF検証でリクエスト本文が読まれる（S3へ送信される）ため、ハンドラーは
+    書き込み権限のある一般ユーザーのログイン済みリクエストにのみ設定する。
+    """
+    protected_view = csrf_protect(view_func)
+
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not (settings.MANUAL_STREAMING_UPLOAD and request.method == 'POST' and can_stream_upload(request)):
+            return protected_view(request, *args, **kwargs)
+
+        request.upload_handlers.insert(0, S3MultipartUploadHandler(request))
+        try:
+            return protected_view(request, *args, **kwargs)
+        finally:
+            # 検証エラー・CSRFエラー等でビューが完了させなかったアップロードは中止
+            if hasattr(request, '_files'):
+                for uploaded in request.FILES.values():
+                    if isinstance(uploaded, S3UploadedFile):
+                        uploaded.discard()
+    return wrapper
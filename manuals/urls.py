@@ -4,8 +4,17 @@ from . import views
 urlpatterns = [
     path('', views.manual_list, name='manual_list'),
     path('create/', views.manual_create, name='manual_create'),
+    path('upload-url/', views.manual_upload_url, name='manual_upload_url'),
+    path('uploads/', views.manual_resumable_upload_start, name='manual_resumable_upload_start'),
+    path('uploads/<str:upload_session_id>/', views.manual_resumable_upload_status, name='manual_resumable_upload_status'),
+    path('uploads/<str:upload_session_id>/chunks/<int:index>/', views.manual_resumable_upload_chunk, name='manual_resumable_upload_chunk'),
+    path('uploads/<str:upload_session_id>/complete/', views.manual_resumable_upload_complete, name='manual_resumable_upload_complete'),
+    path('uploads/<str:upload_session_id>/abort/', views.manual_resumable_upload_abort, name='manual_resumable_upload_abort'),
     path('<int:manual_id>/', views.manual_detail, name='manual_detail'),
     path('<int:manual_id>/edit/', views.manual_edit, name='manual_edit'),
     path('<int:manual_id>/delete/', views.manual_delete, name='manual_delete'),
     path('<int:manual_id>/preview/', views.manual_preview, name='manual_preview'),
+    path('<int:manual_id>/upload-url/', views.manual_upload_url, name='manual_edit_upload_url'),
+    path('<int:manual_id>/upload-complete/', views.manual_upload_complete, name='manual_upload_complete'),
+    path('<int:manual_id>/uploads/', views.manual_resumable_upload_start, name='manual_edit_resumable_upload_start'),
 ]
@@ -1,12 +1,67 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db import transaction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.views.decorators.clickjacking import xframe_options_exempt
-from .models import Manual
-from .forms import ManualForm
-from .s3_utils import upload_file_to_s3, download_file_from_s3, delete_file_from_s3, get_file_url
+from .models import Manual, ManualUploadSession
+from .forms import ManualForm, DirectUploadForm, MAX_PDF_FILE_SIZE
+from .s3_utils import (
+    upload_file_to_s3,
+    build_s3_key,
+    create_multipart_upload,
+    upload_part,
+    list_uploaded_parts,
+    complete_multipart_upload,
+    abort_multipart_upload,
+    generate_presigned_upload,
+    head_file,
+    open_file_stream,
+    iter_file_stream,
+    delete_file_from_s3,
+    get_cached_file_url,
+)
+from .upload_handlers import S3UploadedFile, stream_pdf_upload_to_s3
+from jobs.queue import enqueue
+from users.middleware import get_current_user
+from terao_navi_web.search import paginate_search
+from terao_navi_web.ratelimit import rate_limit, current_user_id, current_company_id
+from botocore.exceptions import ClientError
 import os
+import re
+
+# 単一範囲のRangeヘッダーのみ対応（bytes=開始-終了 / bytes=開始- / bytes=-末尾長）
+RANGE_HEADER_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_preview_url_cache_key(manual, user_id):
+    """
+    プレビュー用の署名付きURLのキャッシュキー
+
+    編集でファイルの保存先が変わった場合に古いURL（削除済みのファイル）を返さないよう、保存先を含める。
+    """
+    return f'manual_preview_url:{manual.manual_id}:{user_id}:{manual.file_path}'
+
+
+def get_byte_range(request):
+    """S3に引き渡すRange指定（単一範囲のみ。複数範囲・不正な指定・指定なしはNone）"""
+    range_header = request.META.get('HTTP_RANGE', '').strip()
+    match = RANGE_HEADER_PATTERN.match(range_header)
+    if match and (match.group(1) or match.group(2)):
+        return range_header
+    return None
+
+
+def is_range_request(request):
+    """
+    PDFビューアーの分割取得（Rangeリクエスト）か
+
+    pdf.jsは最初にファイル全体を要求し、以降は64KB単位のRangeリクエストで続きを取得するため、
+    プレビューのレート制限は最初の要求のみトークンを消費する。
+    """
+    return get_byte_range(request) is not None
 
 
 def require_user_authentication(view_func):
@@ -19,16 +74,40 @@ def require_user_authentication(view_func):
     return wrapper
 
 
-def get_current_user(request):
-    """セッションから現在のユーザーを取得"""
-    from users.models import User
-    user_id = request.session.get('user_id')
-    if user_id:
-        try:
-            return User.objects.get(user_id=user_id, is_active=True)
-        except User.DoesNotExist:
-            return None
-    return None
+def stage_pdf_file(pdf_file, application, filename):
+    """
+    フォームで受け取ったPDFの保存を準備し、後処理ジョブのパラメーターを返す
+    
+    ストリーミングアップロード中のファイルは完了をジョブに引き継ぎ、
+    それ以外はS3の正式なパスへアップロードする。
+    
+    Returns:
+        dict: 後処理ジョブのパラメーター（s3_keyを含む）
+    """
+    s3_key = build_s3_key(application.application_id, filename)
+    if isinstance(pdf_file, S3UploadedFile):
+        return {'s3_key': s3_key, **pdf_file.detach()}
+    upload_file_to_s3(
+        pdf_file.file,
+        application.company_id,
+        application.application_id,
+        filename
+    )
+    return {'s3_key': s3_key}
+
+
+def enqueue_manual_processing(manual, job_payload, old_file_path=None):
+    """マニュアルを処理待ちにして後処理ジョブを登録"""
+    with transaction.atomic():
+        manual.file_path = job_payload['s3_key']
+        manual.processing_status = Manual.PROCESSING_PENDING
+        manual.processing_error = ''
+        manual.save()
+        enqueue('manuals.process_upload', {
+            **job_payload,
+            'manual_id': manual.manual_id,
+            'old_file_path': old_file_path,
+        })
 
 
 @require_user_authentication
@@ -40,23 +119,19 @@ def manual_list(request):
         return redirect('/user/login/')
     
     query = request.GET.get('q', '')
-    manuals = Manual.objects.filter(application__company_id=current_user.company_id).select_related('application', 'application__company')
-    
-    if query:
-        manuals = manuals.filter(
-            Q(manual_name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(application__application_name__icontains=query)
-        )
+    manuals = Manual.objects.filter(company_id=current_user.company_id).select_related('application')
     
+    page = paginate_search(request, manuals, query)
     context = {
-        'manuals': manuals.order_by('-created_at'),
+        'manuals': page.object_list,
+        'page': page,
         'query': query,
         'current_user': current_user,
     }
     return render(request, 'user/manuals/manual_list.html', context)
 
 
+@stream_pdf_upload_to_s3
 @require_user_authentication
 def manual_create(request):
     """マニュアル作成"""
@@ -82,22 +157,22 @@ def manual_create(request):
             try:
                 # まず保存してmanual_idを取得
                 manual.file_size = pdf_file.size
+                manual.processing_status = Manual.PROCESSING_PENDING
                 manual.save()
                 
-                # manual_id.pdfとしてS3にアップロード
+                # manual_id.pdfとして保存し、確定・検証はバックグラウンドで行う
                 filename = f"{manual.manual_id}.pdf"
-                s3_key = upload_file_to_s3(
-                    pdf_file.file,
-                    application.company_id,
-                    application.application_id,
-                    filename
-                )
-                manual.file_path = s3_key
-                manual.save()
+                job_payload = stage_pdf_file(pdf_file, application, filename)
+                enqueue_manual_processing(manual, job_payload)
                 
                 messages.success(request, f'マニュアル「{manual.manual_name}」を作成しました。')
                 return redirect('manual_list')
             except Exception as e:
+                if manual.pk:
+                    Manual.objects.filter(manual_id=manual.pk).update(
+                        processing_status=Manual.PROCESSING_FAILED,
+                        processing_error=str(e),
+                    )
                 messages.error(request, f'ファイルのアップロードに失敗しました: {str(e)}')
     else:
         form = ManualForm(current_user=current_user)
@@ -107,9 +182,11 @@ def manual_create(request):
         'title': 'マニュアル作成',
         'current_user': current_user,
         'manual': None,
+        'direct_upload': settings.MANUAL_DIRECT_UPLOAD,
     })
 
 
+@stream_pdf_upload_to_s3
 @require_user_authentication
 def manual_edit(request, manual_id):
     """マニュアル編集"""
@@ -123,7 +200,7 @@ def manual_edit(request, manual_id):
         messages.error(request, 'マニュアルを編集する権限がありません。')
         return redirect('manual_list')
     
-    manual = get_object_or_404(Manual, manual_id=manual_id, application__company_id=current_user.company_id)
+    manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
     
     if request.method == 'POST':
         form = ManualForm(request.POST, request.FILES, instance=manual, current_user=current_user)
@@ -135,23 +212,12 @@ def manual_edit(request, manual_id):
             pdf_file = form.cleaned_data.get('pdf_file')
             if pdf_file:
                 try:
-                    # 古いファイルを削除
-                    if manual.file_path:
-                        try:
-                            delete_file_from_s3(manual.file_path)
-                        except:
-                            pass  # 削除失敗しても続行
-                    
-                    # manual_id.pdfとしてアップロード
+                    # manual_id.pdfとして保存し、確定・検証・古いファイルの削除はバックグラウンドで行う
+                    old_file_path = manual.file_path
                     filename = f"{manual.manual_id}.pdf"
-                    s3_key = upload_file_to_s3(
-                        pdf_file.file,
-                        application.company_id,
-                        application.application_id,
-                        filename
-                    )
-                    manual.file_path = s3_key
+                    job_payload = stage_pdf_file(pdf_file, application, filename)
                     manual.file_size = pdf_file.size
+                    enqueue_manual_processing(manual, job_payload, old_file_path)
                 except Exception as e:
                     messages.error(request, f'ファイルのアップロードに失敗しました: {str(e)}')
                     return render(request, 'user/manuals/manual_form.html', {
@@ -159,6 +225,7 @@ def manual_edit(request, manual_id):
                         'title': 'マニュアル編集',
                         'manual': manual,
                         'current_user': current_user,
+                        'direct_upload': settings.MANUAL_DIRECT_UPLOAD,
                     })
             
             manual.save()
@@ -172,9 +239,272 @@ def manual_edit(request, manual_id):
         'title': 'マニュアル編集',
         'manual': manual,
         'current_user': current_user,
+        'direct_upload': settings.MANUAL_DIRECT_UPLOAD,
+    })
+
+
+def get_upload_user(request):
+    """
+    アップロードAPI用に現在のユーザーを取得（書き込み権限も確認）
+    
+    Returns:
+        tuple: (ユーザー, エラー時のJsonResponse)
+    """
+    current_user = get_current_user(request)
+    if not current_user:
+        return None, JsonResponse({'error': 'ユーザー情報が見つかりません。'}, status=401)
+    
+    # 書き込み権限チェック（READ_ONLYは不可）
+    if current_user.role_id == 3:  # READ_ONLY
+        return None, JsonResponse({'error': 'マニュアルをアップロードする権限がありません。'}, status=403)
+    
+    return current_user, None
+
+
+def save_manual_for_upload(request, current_user, manual_id=None):
+    """
+    ファイル以外のマニュアル情報を保存（ファイルはアップロード完了時に反映）
+    
+    Returns:
+        tuple: (マニュアル, ファイル情報のcleaned_data, エラー時のJsonResponse)
+    """
+    manual = None
+    if manual_id is not None:
+        manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
+    
+    upload_form = DirectUploadForm(request.POST)
+    form = ManualForm(request.POST, instance=manual, current_user=current_user, direct_upload=True)
+    if not upload_form.is_valid() or not form.is_valid():
+        errors = {**form.errors.get_json_data(), **upload_form.errors.get_json_data()}
+        return None, None, JsonResponse({'errors': errors}, status=400)
+    
+    manual = form.save(commit=False)
+    # 新規作成はアップロード完了まで処理待ち（編集は完了時まで既存のファイル・状態を維持）
+    if manual.pk is None:
+        manual.processing_status = Manual.PROCESSING_PENDING
+    manual.save()
+    return manual, upload_form.cleaned_data, None
+
+
+@require_user_authentication
+@require_POST
+def manual_upload_url(request, manual_id=None):
+    """S3直接アップロード用の署名付きPOSTを発行（manual_idなしは新規作成）"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    manual, _, error_response = save_manual_for_upload(request, current_user, manual_id)
+    if error_response:
+        return error_response
+    
+    s3_key = build_s3_key(manual.application_id, f"{manual.manual_id}.pdf")
+    
+    try:
+        presigned = generate_presigned_upload(
+            s3_key,
+            MAX_PDF_FILE_SIZE,
+            settings.MANUAL_UPLOAD_URL_EXPIRATION,
+        )
+    except Exception as e:
+        return JsonResponse({'error': f'アップロードURLの発行に失敗しました: {str(e)}'}, status=502)
+    
+    return JsonResponse({
+        'manual_id': manual.manual_id,
+        'url': presigned['url'],
+        'fields': presigned['fields'],
+        'complete_url': reverse('manual_upload_complete', args=[manual.manual_id]),
+    })
+
+
+@require_user_authentication
+@require_POST
+def manual_upload_complete(request, manual_id):
+    """S3直接アップロードの完了通知（S3上のファイルを確認して反映）"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
+    s3_key = build_s3_key(manual.application_id, f"{manual.manual_id}.pdf")
+    
+    try:
+        head = head_file(s3_key)
+    except Exception as e:
+        return JsonResponse({'error': f'ファイルの確認に失敗しました: {str(e)}'}, status=502)
+    
+    if head is None:
+        return JsonResponse({'error': 'アップロードされたファイルが見つかりません。'}, status=400)
+    if head.get('ContentType') != 'application/pdf' or head['ContentLength'] > MAX_PDF_FILE_SIZE:
+        # 編集時に現在のファイルと同じ保存先の場合は、表示中のファイルを消さないよう削除しない
+        if s3_key != manual.file_path:
+            delete_file_from_s3(s3_key)
+        return JsonResponse({'error': 'PDFファイル（50MB以下）のみアップロード可能です。'}, status=400)
+    
+    replace_manual_file(manual, s3_key, head['ContentLength'])
+    
+    messages.success(request, f'マニュアル「{manual.manual_name}」を保存しました。')
+    return JsonResponse({'redirect_url': reverse('manual_list')})
+
+
+def replace_manual_file(manual, s3_key, file_size):
+    """アップロード済みのファイルをマニュアルに反映（検証・古いファイルの削除はバックグラウンドで行う）"""
+    old_file_path = manual.file_path
+    manual.file_size = file_size
+    enqueue_manual_processing(manual, {'s3_key': s3_key}, old_file_path)
+
+
+def get_upload_session(current_user, upload_session_id):
+    """同じ会社のアップロード中のセッションを取得"""
+    return get_object_or_404(
+        ManualUploadSession.objects.select_related('manual'),
+        upload_session_id=upload_session_id,
+        manual__company_id=current_user.company_id,
+        status=ManualUploadSession.STATUS_UPLOADING,
+    )
+
+
+def upload_session_status(upload_session, parts):
+    """アップロードセッションの状態をJSON用に整形"""
+    return {
+        'upload_session_id': upload_session.upload_session_id,
+        'manual_id': upload_session.manual_id,
+        'file_size': upload_session.file_size,
+        'chunk_size': upload_session.chunk_size,
+        'total_chunks': upload_session.total_chunks,
+        'uploaded_chunks': sorted(part['PartNumber'] - 1 for part in parts),
+        'status': upload_session.status,
+    }
+
+
+@require_user_authentication
+@require_POST
+def manual_resumable_upload_start(request, manual_id=None):
+    """再開可能なアップロードを開始（manual_idなしは新規作成）"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    manual, file_info, error_response = save_manual_for_upload(request, current_user, manual_id)
+    if error_response:
+        return error_response
+    
+    s3_key = build_s3_key(manual.application_id, f"{manual.manual_id}.pdf")
+    try:
+        upload_id = create_multipart_upload(s3_key)
+    except Exception as e:
+        return JsonResponse({'error': f'アップロードの開始に失敗しました: {str(e)}'}, status=502)
+    
+    upload_session = ManualUploadSession.objects.create(
+        manual=manual,
+        user=current_user,
+        s3_key=s3_key,
+        upload_id=upload_id,
+        file_name=file_info['file_name'],
+        file_size=file_info['file_size'],
+        chunk_size=settings.MANUAL_MULTIPART_PART_SIZE,
+    )
+    return JsonResponse(upload_session_status(upload_session, []), status=201)
+
+
+@require_user_authentication
+@require_POST
+def manual_resumable_upload_chunk(request, upload_session_id, index):
+    """チャンクをアップロード（同じindexの再送は上書き）"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    upload_session = get_upload_session(current_user, upload_session_id)
+    if index >= upload_session.total_chunks:
+        return JsonResponse({'error': 'チャンク番号が範囲外です。'}, status=400)
+    
+    # チャンクはリクエスト本文そのもの（multipartではない）
+    expected_length = upload_session.expected_chunk_length(index)
+    body = request.read(expected_length + 1)
+    if len(body) != expected_length:
+        return JsonResponse({'error': f'チャンクのサイズが不正です（期待値: {expected_length} bytes）。'}, status=400)
+    
+    try:
+        upload_part(upload_session.s3_key, upload_session.upload_id, index + 1, body)
+    except Exception as e:
+        return JsonResponse({'error': f'チャンクのアップロードに失敗しました: {str(e)}'}, status=502)
+    
+    # 放置判定用に最終更新日時を更新
+    upload_session.save(update_fields=['updated_at'])
+    return JsonResponse({'upload_session_id': upload_session.upload_session_id, 'index': index})
+
+
+@require_user_authentication
+def manual_resumable_upload_status(request, upload_session_id):
+    """アップロード済みのチャンクを取得"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    upload_session = get_upload_session(current_user, upload_session_id)
+    try:
+        parts = list_uploaded_parts(upload_session.s3_key, upload_session.upload_id)
+    except Exception as e:
+        return JsonResponse({'error': f'アップロード状況の取得に失敗しました: {str(e)}'}, status=502)
+    
+    return JsonResponse(upload_session_status(upload_session, parts))
+
+
+@require_user_authentication
+@require_POST
+def manual_resumable_upload_complete(request, upload_session_id):
+    """全チャンクのアップロード後にファイルを確定"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    upload_session = get_upload_session(current_user, upload_session_id)
+    try:
+        parts = list_uploaded_parts(upload_session.s3_key, upload_session.upload_id)
+    except Exception as e:
+        return JsonResponse({'error': f'アップロード状況の取得に失敗しました: {str(e)}'}, status=502)
+    
+    if len(parts) != upload_session.total_chunks:
+        return JsonResponse({
+            'error': '未アップロードのチャンクがあります。',
+            **upload_session_status(upload_session, parts),
+        }, status=409)
+    
+    try:
+        complete_multipart_upload(upload_session.s3_key, upload_session.upload_id, parts)
+    except Exception as e:
+        return JsonResponse({'error': f'アップロードの完了に失敗しました: {str(e)}'}, status=502)
+    
+    upload_session.status = ManualUploadSession.STATUS_COMPLETED
+    upload_session.save(update_fields=['status', 'updated_at'])
+    replace_manual_file(upload_session.manual, upload_session.s3_key, upload_session.file_size)
+    
+    return JsonResponse({
+        **upload_session_status(upload_session, parts),
+        'redirect_url': reverse('manual_detail', args=[upload_session.manual_id]),
     })
 
 
+@require_user_authentication
+@require_POST
+def manual_resumable_upload_abort(request, upload_session_id):
+    """アップロードを中止"""
+    current_user, error_response = get_upload_user(request)
+    if error_response:
+        return error_response
+    
+    upload_session = get_upload_session(current_user, upload_session_id)
+    try:
+        abort_multipart_upload(upload_session.s3_key, upload_session.upload_id)
+    except Exception as e:
+        return JsonResponse({'error': f'アップロードの中止に失敗しました: {str(e)}'}, status=502)
+    
+    upload_session.status = ManualUploadSession.STATUS_ABORTED
+    upload_session.save(update_fields=['status', 'updated_at'])
+    return JsonResponse(upload_session_status(upload_session, []))
+
+
 @require_user_authentication
 def manual_delete(request, manual_id):
     """マニュアル削除"""
@@ -188,7 +518,7 @@ def manual_delete(request, manual_id):
         messages.error(request, 'マニュアルを削除する権限がありません。')
         return redirect('manual_list')
     
-    manual = get_object_or_404(Manual, manual_id=manual_id, application__company_id=current_user.company_id)
+    manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
     
     if request.method == 'POST':
         manual_name = manual.manual_name
@@ -213,7 +543,7 @@ def manual_detail(request, manual_id):
         messages.error(request, 'ユーザー情報が見つかりません。')
         return redirect('/user/login/')
     
-    manual = get_object_or_404(Manual, manual_id=manual_id, application__company_id=current_user.company_id)
+    manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
     
     return render(request, 'user/manuals/manual_detail.html', {
         'manual': manual,
@@ -222,6 +552,10 @@ def manual_detail(request, manual_id):
 
 
 @require_user_authentication
+@rate_limit('manual_preview', [
+    (current_user_id, 'MANUAL_PREVIEW_RATE_LIMIT_PER_USER'),
+    (current_company_id, 'MANUAL_PREVIEW_RATE_LIMIT_PER_COMPANY'),
+], exempt=is_range_request)
 @xframe_options_exempt
 def manual_preview(request, manual_id):
     """マニュアルプレビュー"""
@@ -230,17 +564,57 @@ def manual_preview(request, manual_id):
         messages.error(request, 'ユーザー情報が見つかりません。')
         return redirect('/user/login/')
     
-    manual = get_object_or_404(Manual, manual_id=manual_id, application__company_id=current_user.company_id)
+    manual = get_object_or_404(Manual, manual_id=manual_id, company_id=current_user.company_id)
+    
+    # 後処理が完了していないファイルは表示しない
+    if not manual.is_ready:
+        messages.error(request, f'ファイルは{manual.get_processing_status_display()}です。')
+        return redirect('manual_detail', manual_id=manual_id)
+    
+    # リダイレクトモード: 署名付きURLへ転送し、PDFの転送はS3に任せる
+    if settings.MANUAL_PREVIEW_DELIVERY == 'redirect':
+        try:
+            url = get_cached_file_url(
+                manual.file_path,
+                get_preview_url_cache_key(manual, current_user.user_id),
+                settings.MANUAL_PREVIEW_URL_EXPIRATION,
+                settings.MANUAL_PREVIEW_URL_CACHE_RATIO,
+                response_params={
+                    'ResponseContentType': 'application/pdf',
+                    'ResponseContentDisposition': f'inline; filename="{os.path.basename(manual.file_path)}"',
+                },
+            )
+        except Exception as e:
+            messages.error(request, f'ファイルのプレビューに失敗しました: {str(e)}')
+            return redirect('manual_detail', manual_id=manual_id)
+        return redirect(url)
+    
+    # 単一範囲のRange指定のみS3に引き渡す（複数範囲・不正な指定はファイル全体を返す）
+    byte_range = get_byte_range(request)
     
     try:
-        # S3からファイルを取得
-        file_content = download_file_from_s3(manual.file_path)
-        
-        # PDFとして表示（ダウンロードではなくインライン表示）
-        response = HttpResponse(file_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="{os.path.basename(manual.file_path)}"'
-        response['X-Frame-Options'] = 'SAMEORIGIN'
-        return response
+        # S3からファイルをストリームとして取得（本文はチャンク単位で転送）
+        s3_response = open_file_stream(manual.file_path, byte_range)
     except Exception as e:
+        # 範囲外の指定は416で応答
+        if isinstance(e, ClientError) and e.response.get('Error', {}).get('Code') == 'InvalidRange':
+            response = HttpResponse(status=416)
+            if manual.file_size:
+                response['Content-Range'] = f'bytes */{manual.file_size}'
+            return response
         messages.error(request, f'ファイルのプレビューに失敗しました: {str(e)}')
         return redirect('manual_detail', manual_id=manual_id)
+    
+    # PDFとして表示（ダウンロードではなくインライン表示）
+    response = StreamingHttpResponse(
+        iter_file_stream(s3_response['Body'], settings.MANUAL_PREVIEW_CHUNK_SIZE),
+        content_type='application/pdf',
+        status=206 if s3_response.get('ContentRange') else 200,
+    )
+    if s3_response.get('ContentRange'):
+        response['Content-Range'] = s3_response['ContentRange']
+    response['Content-Length'] = s3_response['ContentLength']
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'inline; filename="{os.path.basename(manual.file_path)}"'
+    response['X-Frame-Options'] = 'SAMEORIGIN'
+    return response
@@ -1,23 +1,55 @@
+from functools import lru_cache
+
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.crypto import get_random_string
 
 User = get_user_model()
 
 
+@lru_cache(maxsize=None)
+def get_dummy_password_hash():
+    """ユーザーが存在しない場合の照合に使うダミーのパスワードハッシュ（初回のみ生成）"""
+    return make_password(get_random_string(32))
+
+
+def run_dummy_password_check(password):
+    """
+    実在ユーザーと同じコストでダミーのハッシュを照合する
+
+    ユーザーが存在しない場合も応答時間を揃え、ユーザー名・メールアドレスの存在を推測されないようにする。
+    """
+    check_password(password, get_dummy_password_hash())
+
+
+def find_user_by_email_or_username(queryset, login):
+    """
+    メールアドレスまたはユーザー名に一致するユーザーを1回のクエリで取得
+
+    メールアドレスは一意ではないため、メールアドレスの一致を優先し、同順位は主キーの昇順で1件に決める。
+
+    Returns:
+        ユーザー、見つからない場合None
+    """
+    if not login:
+        return None
+    return queryset.filter(Q(email=login) | Q(username=login)).order_by(
+        Case(When(email=login, then=Value(0)), default=Value(1), output_field=IntegerField()),
+        'pk',
+    ).first()
+
+
 class EmailOrUsernameModelBackend(ModelBackend):
     """メールアドレスまたはユーザー名でログインできる認証バックエンド"""
 
     def authenticate(self, request, username=None, password=None, **kwargs):
         """メールアドレスまたはユーザー名で認証"""
-        try:
-            # まずメールアドレスで検索
-            user = User.objects.get(email=username)
-        except User.DoesNotExist:
-            # メールアドレスで見つからない場合はユーザー名で検索
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                return None
+        user = find_user_by_email_or_username(User._default_manager, username)
+        if user is None:
+            run_dummy_password_check(password)
+            return None
 
         # パスワードチェック
         if user.check_password(password) and self.user_can_authenticate(user):
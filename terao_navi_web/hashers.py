@@ -0,0 +1,18 @@
+"""
+ハッシュ化のコスト（反復回数）を設定で調整できるパスワードハッシャー
+
+反復回数はPASSWORD_HASH_ITERATIONSで指定する（0の場合はDjango標準の回数）。
+calibrate_password_hasherコマンドで実機のハッシュ化時間を計測し、目標の所要時間に合う回数を決める。
+アルゴリズム名はDjango標準のPBKDF2と同じため、既存のハッシュもそのまま照合でき、
+反復回数が設定と異なるハッシュはログイン成功時に再ハッシュされる。
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PASSWORD_HASH_ITERATIONSの反復回数でハッシュ化するPBKDF2ハッシャー"""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,229 @@
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+# 1ページあたりの件数の選択肢
+PAGE_SIZE_CHOICES = (20, 50, 100)
+DEFAULT_PAGE_SIZE = PAGE_SIZE_CHOICES[0]
+
+# ページ位置を表すクエリパラメーター
+CURSOR_PARAM = 'cursor'
+PAGE_SIZE_PARAM = 'page_size'
+
+
+def encode_cursor(direction, obj):
+    """レコードの (created_at, pk) からカーソルを生成"""
+    data = json.dumps([direction, obj.created_at.isoformat(), obj.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    カーソルを解析
+
+    Returns:
+        tuple or None: (direction, created_at, pk) 不正なカーソルの場合None
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, created_at, pk = json.loads(data)
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """
+    キーセットページネーションの1ページ分
+
+    ページ内のレコードと、前後のページへのURL・件数の選択肢を持つ。
+    検索の一致度順のページ（paginate_by_rank）も同じクラスで表す。
+    """
+
+    def __init__(self, request, object_list, page_size, next_cursor, previous_cursor):
+        self.request = request
+        self.object_list = object_list
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size_choices = PAGE_SIZE_CHOICES
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _url(self, cursor):
+        params = self.request.GET.copy()
+        params[CURSOR_PARAM] = cursor
+        params[PAGE_SIZE_PARAM] = self.page_size
+        return f"?{params.urlencode()}"
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else ''
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor) if self.has_previous else ''
+
+    @property
+    def preserved_params(self):
+        """件数を変更するフォームに引き継ぐクエリパラメーター（ページ位置は先頭に戻す）"""
+        return [
+            (name, value)
+            for name, values in self.request.GET.lists()
+            if name not in (CURSOR_PARAM, PAGE_SIZE_PARAM)
+            for value in values
+        ]
+
+
+def get_page_size(request):
+    """リクエストから1ページあたりの件数を取得（選択肢以外は既定値）"""
+    try:
+        page_size = int(request.GET.get(PAGE_SIZE_PARAM, DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    return page_size if page_size in PAGE_SIZE_CHOICES else DEFAULT_PAGE_SIZE
+
+
+def paginate_by_keyset(request, queryset):
+    """
+    (created_at, pk) の降順でキーセットページネーション
+
+    OFFSETを使わず、直前のページの端のレコードより後（前）を取得するため、
+    ページの深さによらず同じ速さで取得できる。
+
+    Args:
+        request: リクエスト（cursor, page_size を参照）
+        queryset: created_at を持つモデルのクエリセット
+
+    Returns:
+        KeysetPage: ページ
+    """
+    page_size = get_page_size(request)
+    cursor = decode_cursor(request.GET.get(CURSOR_PARAM, ''))
+
+    if cursor is None:
+        direction = None
+        rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+    else:
+        direction, created_at, pk = cursor
+        if direction == 'next':
+            rows = list(
+                queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+                .order_by('-created_at', '-pk')[:page_size + 1]
+            )
+        else:
+            rows = list(
+                queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+                .order_by('created_at', 'pk')[:page_size + 1]
+            )
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == 'prev':
+        rows.reverse()
+
+    # カーソルの先にレコードがない（削除された等）場合は先頭ページを表示
+    if not rows and direction is not None:
+        direction = None
+        rows = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+    if not rows:
+        return KeysetPage(request, rows, page_size, None, None)
+
+    # 取得した方向にさらにレコードがあるか、反対方向から移動してきた場合に前後のページがある
+    has_next = has_more if direction in (None, 'next') else True
+    has_previous = has_more if direction == 'prev' else direction == 'next'
+    return KeysetPage(
+        request,
+        rows,
+        page_size,
+        encode_cursor('next', rows[-1]) if has_next else None,
+        encode_cursor('prev', rows[0]) if has_previous else None,
+    )
+
+
+def encode_offset_cursor(offset):
+    """順位付けした検索結果の位置（先頭からの件数）からカーソルを生成"""
+    data = json.dumps(['rank', offset], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).rstrip(b'=').decode('ascii')
+
+
+def decode_offset_cursor(cursor):
+    """
+    順位付けした検索結果のカーソルを解析
+
+    Returns:
+        int: 先頭からの件数（不正なカーソルの場合0）
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        kind, offset = json.loads(data)
+        if kind != 'rank':
+            return 0
+        return max(0, int(offset))
+    except (TypeError, ValueError):
+        return 0
+
+
+def paginate_by_rank(request, queryset):
+    """
+    検索の一致度（search_rank）の降順でページネーション
+
+    一致度はレコードごとに計算される値のためキーセットにできず、OFFSETでページを送る。
+    深いページのOFFSETが重くならないよう、上位SEARCH_MAX_RESULTS件までを対象とする。
+
+    Args:
+        request: リクエスト（cursor, page_size を参照）
+        queryset: search_rankで注釈されたクエリセット
+
+    Returns:
+        KeysetPage: ページ
+    """
+    page_size = get_page_size(request)
+    limit = settings.SEARCH_MAX_RESULTS
+    offset = decode_offset_cursor(request.GET.get(CURSOR_PARAM, ''))
+    if offset >= limit:
+        offset = 0
+    end = min(offset + page_size, limit)
+
+    queryset = queryset.order_by('-search_rank', '-created_at', '-pk')
+    rows = list(queryset[offset:end + 1])
+
+    # カーソルの先にレコードがない場合は先頭ページを表示
+    if not rows and offset:
+        offset, end = 0, min(page_size, limit)
+        rows = list(queryset[:end + 1])
+
+    has_next = len(rows) > end - offset and end < limit
+    rows = rows[:end - offset]
+    return KeysetPage(
+        request,
+        rows,
+        page_size,
+        encode_offset_cursor(end) if has_next else None,
+        encode_offset_cursor(max(0, offset - page_size)) if offset else None,
+    )
@@ -0,0 +1,147 @@
+"""
+キャッシュに保存するトークンバケット方式のレート制限
+
+ビューに@rate_limitを付けると、IPアドレス・ユーザー名・会社などのキーごとにバケットを持ち、
+リクエストごとにトークンを1つ消費する。トークンが尽きた場合はビューを呼ばずに
+429（Retry-After付き）を返すため、パスワードのハッシュ化やS3からのダウンロードは行われない。
+
+制限値は "回数/秒数" の形式で設定し（例: '10/60' は60秒あたり10回、最大10回まで連続で許可）、
+空文字の場合はそのキーの制限を行わない。
+バケットは共有キャッシュ（CACHES）に保存するため、複数プロセスで制限を共有するにはRedisなどを使用する。
+キャッシュの読み書きはアトミックではないため、同時リクエストでは制限をわずかに超える場合がある。
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from users.middleware import get_current_user
+
+
+BUCKET_KEY = 'ratelimit:{scope}:{name}:{digest}'
+
+
+def parse_rate(rate):
+    """
+    制限値を解析
+
+    Returns:
+        tuple or None: (バケットの容量, 1秒あたりの補充数)、制限しない場合None
+    """
+    if not rate:
+        return None
+    count, period = rate.split('/', 1)
+    count, period = int(count), float(period)
+    if count <= 0 or period <= 0:
+        return None
+    return count, count / period
+
+
+def consume_token(key, capacity, refill_rate, now=None):
+    """
+    バケットからトークンを1つ消費
+
+    Args:
+        key: バケットのキャッシュキー
+        capacity: バケットの容量（連続で許可する回数）
+        refill_rate: 1秒あたりに補充するトークン数
+        now: 現在時刻（省略時はtime.time()）
+
+    Returns:
+        float: 0の場合は許可、正の値の場合は次のトークンが補充されるまでの秒数
+    """
+    if now is None:
+        now = time.time()
+    tokens, updated_at = cache.get(key) or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+    # 満杯になるまでの時間だけ保持すれば十分
+    timeout = math.ceil(capacity / refill_rate) + 1
+    if tokens < 1:
+        cache.set(key, (tokens, now), timeout)
+        return (1 - tokens) / refill_rate
+    cache.set(key, (tokens - 1, now), timeout)
+    return 0.0
+
+
+def client_ip(request):
+    """
+    クライアントのIPアドレス
+
+    RATE_LIMIT_TRUSTED_PROXIESにリバースプロキシの段数を設定した場合は、
+    X-Forwarded-Forの右から数えてプロキシの段数番目のアドレスを使う（偽装された左側の値は使わない）。
+    """
+    proxies = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def login_username(request):
+    """ログインフォームに入力されたユーザー名・メールアドレス（大文字小文字を区別しない）"""
+    username = request.POST.get('username', '').strip().lower()
+    return username or None
+
+
+def current_user_id(request):
+    """ログイン中の一般ユーザーのID"""
+    user = get_current_user(request)
+    return user.user_id if user else None
+
+
+def current_company_id(request):
+    """ログイン中の一般ユーザーの会社ID"""
+    user = get_current_user(request)
+    return user.company_id if user else None
+
+
+def too_many_requests(retry_after):
+    """429レスポンス（テンプレートを使わずに返す）"""
+    response = HttpResponse(
+        'リクエストが多すぎます。しばらく待ってから再度お試しください。',
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(scope, limits, methods=None, exempt=None):
+    """
+    トークンバケットでビューのリクエスト数を制限するデコレーター
+
+    Args:
+        scope: バケットを区別する名前（ビューごとに指定）
+        limits: (キー関数, 制限値の設定名) のリスト。キー関数はリクエストから識別子を返し、
+                Noneの場合はそのキーの制限を行わない
+        methods: 制限するHTTPメソッド（省略時は全メソッド）
+        exempt: リクエストを受け取り、Trueの場合はトークンを消費しない関数（省略時は全リクエストを制限）
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                settings.RATE_LIMIT_ENABLED
+                and (methods is None or request.method in methods)
+                and not (exempt and exempt(request))
+            ):
+                for key_func, setting_name in limits:
+                    rate = parse_rate(getattr(settings, setting_name))
+                    identity = key_func(request)
+                    if rate is None or identity is None:
+                        continue
+                    # キャッシュキーに使えない文字やユーザー名をそのまま保存しないようハッシュ化する
+                    digest = hashlib.sha256(str(identity).encode()).hexdigest()
+                    key = BUCKET_KEY.format(scope=scope, name=key_func.__name__, digest=digest)
+                    retry_after = consume_token(key, *rate)
+                    if retry_after:
+                        return too_many_requests(retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
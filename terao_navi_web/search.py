@@ -0,0 +1,150 @@
+"""
+一覧画面の検索
+
+検索対象の列はモデルのsearch_fieldsで宣言する（関連モデルの列は 'application__application_name' のように指定）。
+MySQLではngramパーサーのFULLTEXTインデックスで検索し、一致度の高い順に並べる。
+FULLTEXTインデックスはensure_fulltext_indexesコマンドで作成する。
+
+ngramパーサーは ngram_token_size（MySQLの設定、既定2）文字未満の語を検索できないため、
+短い語を含む検索、MySQL以外のDB、SEARCH_BACKEND='icontains' の場合は部分一致（LIKE '%語%'）で検索する。
+空白で区切った複数の語は、すべてを含むレコードを検索する（語ごとに、いずれかの検索対象の列に含まれていればよい）。
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Q
+
+from .pagination import paginate_by_keyset, paginate_by_rank
+
+
+def get_search_terms(query):
+    """検索語を空白で分割（全角スペースも区切りとする）"""
+    return [term for term in query.replace('　', ' ').split() if term]
+
+
+class SearchMatch(Func):
+    """MATCH (列, ...) AGAINST (検索式 IN BOOLEAN MODE)"""
+
+    template = 'MATCH (%(expressions)s) AGAINST (%(against)s IN BOOLEAN MODE)'
+
+    def __init__(self, *field_names, against, output_field=None):
+        super().__init__(*(F(name) for name in field_names), output_field=output_field or FloatField())
+        self.against = against
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, against='%s', **extra_context)
+        return sql, (*params, self.against)
+
+
+def get_fulltext_indexes(model):
+    """
+    モデルのsearch_fieldsに必要なFULLTEXTインデックス
+
+    Returns:
+        list: (検索パス, 対象モデル, フィールド名のタプル) のリスト。検索パスはモデル自身の場合 ''
+    """
+    groups = {}
+    for field_path in model.search_fields:
+        path, _, name = field_path.rpartition('__')
+        groups.setdefault(path, []).append(name)
+
+    indexes = []
+    for path, names in groups.items():
+        target = model
+        for part in path.split('__') if path else []:
+            target = target._meta.get_field(part).related_model
+        indexes.append((path, target, tuple(names)))
+    return indexes
+
+
+def to_boolean_query(terms, required=True):
+    """
+    検索語をBOOLEAN MODEの検索式に変換（各語をフレーズとし、演算子は無効化する）
+
+    Args:
+        required: Trueの場合は各語を必須（+）、Falseの場合はいずれかの語を含めば一致とする
+    """
+    phrases = []
+    for term in terms:
+        term = term.replace('"', '')
+        if term:
+            phrases.append(f'+"{term}"' if required else f'"{term}"')
+    return ' '.join(phrases)
+
+
+def use_fulltext(queryset, terms):
+    """FULLTEXTインデックスで検索できるか"""
+    return (
+        settings.SEARCH_BACKEND == 'fulltext'
+        and connections[queryset.db].vendor == 'mysql'
+        and all(len(term.replace('"', '')) >= settings.SEARCH_NGRAM_TOKEN_SIZE for term in terms)
+    )
+
+
+def _fulltext_search(queryset, terms):
+    indexes = get_fulltext_indexes(queryset.model)
+
+    # 語ごとに、モデル自身の列・関連モデルの列のいずれかに含まれるレコードに絞り込む
+    # （部分一致検索と同じく、語が別々の列グループにあっても一致する）
+    for term in terms:
+        against = to_boolean_query([term])
+        condition = Q()
+        for path, target, names in indexes:
+            if not path:
+                condition |= Q(SearchMatch(*names, against=against, output_field=BooleanField()))
+            else:
+                # 関連モデルの列は、関連モデル側のFULLTEXTインデックスで主キーを絞り込む
+                matched = target._base_manager.filter(SearchMatch(*names, against=against, output_field=BooleanField()))
+                condition |= Q(**{f'{path}__in': matched.values('pk')})
+        queryset = queryset.filter(condition)
+
+    # モデル自身の列に含まれる語の一致度で順位を付ける
+    for path, target, names in indexes:
+        if not path:
+            queryset = queryset.annotate(search_rank=SearchMatch(*names, against=to_boolean_query(terms, required=False)))
+    return queryset
+
+
+def _icontains_search(queryset, terms):
+    for term in terms:
+        condition = Q()
+        for field_path in queryset.model.search_fields:
+            condition |= Q(**{f'{field_path}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def search(queryset, query):
+    """
+    クエリセットをsearch_fieldsで検索
+
+    Args:
+        queryset: search_fieldsを持つモデルのクエリセット
+        query: 検索語（空白区切りで複数指定可）
+
+    Returns:
+        tuple: (絞り込んだクエリセット, 一致度で順位付けしたか)
+               順位付けした場合はsearch_rankで注釈される
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return queryset, False
+    if use_fulltext(queryset, terms):
+        queryset = _fulltext_search(queryset, terms)
+        return queryset, 'search_rank' in queryset.query.annotations
+    return _icontains_search(queryset, terms), False
+
+
+def paginate_search(request, queryset, query):
+    """
+    一覧画面の検索とページネーション
+
+    検索語がない場合と部分一致検索の場合は作成日時の降順、
+    FULLTEXT検索の場合は一致度の降順でページを返す。
+
+    Returns:
+        KeysetPage: ページ
+    """
+    queryset, ranked = search(queryset, query)
+    if ranked:
+        return paginate_by_rank(request, queryset)
+    return paginate_by_keyset(request, queryset)
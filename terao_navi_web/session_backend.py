@@ -0,0 +1,60 @@
+"""
+キャッシュを優先し、DBへの書き込みを遅延させるセッションエンジン
+
+SESSION_ENGINE = 'terao_navi_web.session_backend' で有効にする。
+読み込みはキャッシュから行い（キャッシュにない場合のみDB）、書き込みはキャッシュを即時に更新して、
+DBへは前回の書き込みからSESSION_WRITE_BEHIND_INTERVAL秒以上経過した場合のみ書き込む。
+ログイン・ログアウトなど認証に関わるキーが変わった場合は即座にDBへ書き込む。
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+# 変更時に即座にDBへ書き込むキー（一般ユーザーの認証状態）
+AUTH_SESSION_KEYS = ('is_user_authenticated', 'user_id')
+
+
+class SessionStore(CachedDBStore):
+    """キャッシュ優先・DB遅延書き込みのセッションストア"""
+
+    cache_key_prefix = 'terao_navi_web.session_backend'
+
+    @property
+    def persisted_key(self):
+        """最後にDBへ書き込んだ日時のキャッシュキー"""
+        return f"{self.cache_key}:persisted"
+
+    def _auth_state(self, data):
+        return tuple(data.get(key) for key in AUTH_SESSION_KEYS)
+
+    def load(self):
+        data = super().load()
+        self._loaded_auth_state = self._auth_state(data)
+        return data
+
+    def _needs_db_write(self):
+        """DBへの書き込みが必要か（認証状態の変更、または前回の書き込みから一定時間経過）"""
+        if self._auth_state(self._session) != getattr(self, '_loaded_auth_state', None):
+            return True
+        persisted_at = self._cache.get(self.persisted_key)
+        return persisted_at is None or time.time() - persisted_at >= settings.SESSION_WRITE_BEHIND_INTERVAL
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None or self._needs_db_write():
+            super().save(must_create)
+            if self.session_key is not None:
+                self._cache.set(self.persisted_key, time.time(), self.get_expiry_age())
+                self._loaded_auth_state = self._auth_state(self._session)
+            return
+
+        # DBへの書き込みは後回しにし、キャッシュのみ更新
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        super().delete(session_key)
+        if session_key is not None:
+            self._cache.delete(f"{self.cache_key_prefix}{session_key}:persisted")
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +44,7 @@ INSTALLED_APPS = [
     'users',
     'applications',
     'manuals',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CurrentUserMiddleware',  # 一般ユーザーをrequest.current_userに設定
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,6 +96,60 @@ DATABASES = {
 }
 
 
+# Cache
+# 既定はプロセス内メモリ。複数プロセスで共有する場合は CACHE_BACKEND / CACHE_LOCATION で
+# Redis等を指定する（例: django.core.cache.backends.redis.RedisCache, redis://navi-redis:6379/0）
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Sessions
+# terao_navi_web.session_backend: キャッシュ優先・DB遅延書き込み（共有キャッシュの場合のみ指定する）
+# プロセス内メモリのキャッシュではログアウトが他のプロセスに反映されないため、既定はDB
+
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+# キャッシュ優先のセッションで、DBへ書き込む最短間隔（秒）
+SESSION_WRITE_BEHIND_INTERVAL = int(os.getenv('SESSION_WRITE_BEHIND_INTERVAL', '300'))
+
+
+# パスワードハッシャー（先頭のハッシャーでハッシュ化し、残りは既存ハッシュの照合に使用）
+# CalibratedPBKDF2PasswordHasherはDjango標準のPBKDF2（pbkdf2_sha256）のハッシュも照合する
+PASSWORD_HASHERS = [
+    'terao_navi_web.hashers.CalibratedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# パスワードハッシュの反復回数（0の場合はDjango標準。calibrate_password_hasherコマンドで実機に合わせて決める）
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '0'))
+
+
+# レート制限（terao_navi_web.ratelimit、"回数/秒数" で指定し、空文字の場合は制限しない）
+# バケットはCACHESに保存するため、複数プロセスで制限を共有する場合は共有キャッシュを使用する
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+# リバースプロキシの段数（0の場合はREMOTE_ADDRをクライアントのIPアドレスとする）
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+LOGIN_RATE_LIMIT_PER_IP = os.getenv('LOGIN_RATE_LIMIT_PER_IP', '30/60')
+LOGIN_RATE_LIMIT_PER_USERNAME = os.getenv('LOGIN_RATE_LIMIT_PER_USERNAME', '5/60')
+# プレビューはPDFを開いた回数で制限する（PDFビューアーが続きを取得するRangeリクエストは数えない）
+MANUAL_PREVIEW_RATE_LIMIT_PER_USER = os.getenv('MANUAL_PREVIEW_RATE_LIMIT_PER_USER', '30/60')
+MANUAL_PREVIEW_RATE_LIMIT_PER_COMPANY = os.getenv('MANUAL_PREVIEW_RATE_LIMIT_PER_COMPANY', '300/60')
+
+# 一覧画面の検索（terao_navi_web.search）
+# fulltext: MySQLのFULLTEXTインデックス（ngramパーサー）で検索し一致度順に表示、icontains: 部分一致
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'fulltext')
+# MySQLのngram_token_sizeと同じ値（これより短い語は部分一致で検索する）
+SEARCH_NGRAM_TOKEN_SIZE = int(os.getenv('SEARCH_NGRAM_TOKEN_SIZE', '2'))
+# 一致度順に表示する検索結果の上限件数
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '1000'))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -162,9 +220,93 @@ AWS_S3_USE_SSL = os.getenv('AWS_S3_USE_SSL', 'False') == 'True'
 AWS_S3_SIGNATURE_VERSION = 's3v4'
 AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', 'us-east-1')
 
+# S3クライアントの接続プール・タイムアウト設定
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', '20'))
+AWS_S3_CONNECT_TIMEOUT = float(os.getenv('AWS_S3_CONNECT_TIMEOUT', '3'))
+AWS_S3_READ_TIMEOUT = float(os.getenv('AWS_S3_READ_TIMEOUT', '30'))
+AWS_S3_TCP_KEEPALIVE = os.getenv('AWS_S3_TCP_KEEPALIVE', 'True') == 'True'
+
+# 一般ユーザー（会社・ロールを含む）のスナップショットをキャッシュする秒数（0: キャッシュしない）
+# 無効化はキャッシュ上のバージョンで行うため、複数プロセスで共有するキャッシュ（Redis等）の場合のみ有効にする
+CURRENT_USER_CACHE_TIMEOUT = int(os.getenv('CURRENT_USER_CACHE_TIMEOUT', '0'))
+
+# マニュアルプレビューのストリーミング転送単位（bytes）
+MANUAL_PREVIEW_CHUNK_SIZE = int(os.getenv('MANUAL_PREVIEW_CHUNK_SIZE', str(64 * 1024)))
+
+# マニュアルプレビューの配信方式（proxy: Django経由で転送 / redirect: 署名付きURLへリダイレクト）
+MANUAL_PREVIEW_DELIVERY = os.getenv('MANUAL_PREVIEW_DELIVERY', 'proxy')
+# 署名付きURLの有効期限（秒）と、そのうちキャッシュする割合
+MANUAL_PREVIEW_URL_EXPIRATION = int(os.getenv('MANUAL_PREVIEW_URL_EXPIRATION', '300'))
+MANUAL_PREVIEW_URL_CACHE_RATIO = float(os.getenv('MANUAL_PREVIEW_URL_CACHE_RATIO', '0.5'))
+
+# マニュアルPDFをブラウザからS3へ直接アップロードするか、およびその署名付きPOSTの有効期限（秒）
+MANUAL_DIRECT_UPLOAD = os.getenv('MANUAL_DIRECT_UPLOAD', 'False') == 'True'
+MANUAL_UPLOAD_URL_EXPIRATION = int(os.getenv('MANUAL_UPLOAD_URL_EXPIRATION', '600'))
+
+# マニュアルPDFを受信しながらS3マルチパートアップロードへ流すか、およびパートサイズ（bytes, 5MB以上）と同時送信数
+MANUAL_STREAMING_UPLOAD = os.getenv('MANUAL_STREAMING_UPLOAD', 'True') == 'True'
+MANUAL_MULTIPART_PART_SIZE = int(os.getenv('MANUAL_MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))
+MANUAL_MULTIPART_CONCURRENCY = int(os.getenv('MANUAL_MULTIPART_CONCURRENCY', '4'))
+
 # DynamoDB Settings (DynamoDB Local for local)
 DYNAMODB_ENDPOINT_URL = os.getenv('DYNAMODB_ENDPOINT_URL', 'http://navi-dynamodb:8000')
 DYNAMODB_REGION_NAME = os.getenv('DYNAMODB_REGION_NAME', 'ap-northeast-1')
 DYNAMODB_ACCESS_KEY_ID = os.getenv('DYNAMODB_ACCESS_KEY_ID', 'dummy')
 DYNAMODB_SECRET_ACCESS_KEY = os.getenv('DYNAMODB_SECRET_ACCESS_KEY', 'dummy')
 DYNAMODB_TABLE_PREFIX = os.getenv('DYNAMODB_TABLE_PREFIX', '')
+
+
+# DynamoDBクライアントの接続プール・リトライ・タイムアウト設定
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '20'))
+DYNAMODB_CONNECT_TIMEOUT = float(os.getenv('DYNAMODB_CONNECT_TIMEOUT', '2'))
+DYNAMODB_READ_TIMEOUT = float(os.getenv('DYNAMODB_READ_TIMEOUT', '5'))
+DYNAMODB_RETRY_MODE = os.getenv('DYNAMODB_RETRY_MODE', 'adaptive')
+DYNAMODB_MAX_ATTEMPTS = int(os.getenv('DYNAMODB_MAX_ATTEMPTS', '3'))
+# BatchWriteItemの未処理分の再試行回数・並列送信数と、並列Scanのセグメント数
+DYNAMODB_BATCH_MAX_RETRIES = int(os.getenv('DYNAMODB_BATCH_MAX_RETRIES', '8'))
+DYNAMODB_BATCH_WRITE_WORKERS = int(os.getenv('DYNAMODB_BATCH_WRITE_WORKERS', '4'))
+DYNAMODB_SCAN_SEGMENTS = int(os.getenv('DYNAMODB_SCAN_SEGMENTS', '4'))
+
+# クライアント認証結果のキャッシュ（件数上限・有効秒数・存在しないclient_idの有効秒数）
+# 無効化・削除は他プロセスではTTL経過後に反映されるため、TTLは短く保つ
+AUTH_CLIENT_CACHE_SIZE = int(os.getenv('AUTH_CLIENT_CACHE_SIZE', '10000'))
+AUTH_CLIENT_CACHE_TTL = float(os.getenv('AUTH_CLIENT_CACHE_TTL', '30'))
+AUTH_CLIENT_NEGATIVE_CACHE_TTL = float(os.getenv('AUTH_CLIENT_NEGATIVE_CACHE_TTL', '5'))
+
+# クライアントアプリ用アクセストークンの署名鍵と有効秒数
+# 署名鍵は "kid:secret" のカンマ区切りで指定し、先頭の鍵で署名する（残りは検証のみに使用）
+# 鍵をローテーションする場合は新しい鍵を先頭に追加し、有効秒数の経過後に旧鍵を削除する
+def parse_signing_keys(value):
+    """AUTH_TOKEN_SIGNING_KEYSを (kid, secret) のリストに変換（不正な指定は起動時にエラーにする）"""
+    keys = []
+    for position, entry in enumerate(value.split(','), start=1):
+        if not entry:
+            continue
+        kid, separator, secret = entry.partition(':')
+        if not separator or not kid or not secret:
+            # 署名鍵を含むためエラーメッセージには値を出さない
+            raise ImproperlyConfigured(f'AUTH_TOKEN_SIGNING_KEYS: {position}番目の鍵を "kid:secret" の形式で指定してください。')
+        # トークンは "v1.kid.payload.sig" の形式のため、kidに "." は使えない
+        if '.' in kid:
+            raise ImproperlyConfigured(f'AUTH_TOKEN_SIGNING_KEYS: kidに "." は使用できません（{kid}）。')
+        if kid in dict(keys):
+            raise ImproperlyConfigured(f'AUTH_TOKEN_SIGNING_KEYS: kidが重複しています（{kid}）。')
+        keys.append((kid, secret))
+    if not keys:
+        raise ImproperlyConfigured('AUTH_TOKEN_SIGNING_KEYS: 署名鍵を1つ以上指定してください。')
+    return keys
+
+
+AUTH_TOKEN_SIGNING_KEYS = parse_signing_keys(os.getenv('AUTH_TOKEN_SIGNING_KEYS', f'default:{SECRET_KEY}'))
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', '300'))
+
+# バックグラウンドジョブ（jobsアプリ）の設定
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', '4'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_DELAY = int(os.getenv('JOB_RETRY_BASE_DELAY', '10'))
+JOB_RETRY_MAX_DELAY = int(os.getenv('JOB_RETRY_MAX_DELAY', '600'))
+# 実行中のジョブはワーカーがJOB_HEARTBEAT_INTERVAL秒ごとに更新し、JOB_LOCK_TIMEOUT秒以上更新されない
+# ジョブ（ワーカーが停止したもの）を待機中に戻す。タイムアウトは更新間隔の数倍以上にする
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', '60'))
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', '900'))
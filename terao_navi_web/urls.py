@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from . import views
 from users.urls import user_urlpatterns
+from companies import views as company_views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -36,4 +37,6 @@ urlpatterns = [
     # カスタム管理画面（スーパーユーザー用）
     path('companies/', include('companies.urls')),
     path('users/', include('users.urls')),
+    # クライアントアプリ用API
+    path('api/token/', company_views.auth_token, name='api_auth_token'),
 ]
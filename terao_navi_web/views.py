@@ -2,6 +2,14 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import logout, authenticate, login
 from django.contrib import messages
 from users.auth_backend import UserAuthBackend
+from .ratelimit import rate_limit, client_ip, login_username
+
+
+# ログイン試行の制限（パスワードのハッシュ化より前に判定する）
+LOGIN_RATE_LIMITS = [
+    (client_ip, 'LOGIN_RATE_LIMIT_PER_IP'),
+    (login_username, 'LOGIN_RATE_LIMIT_PER_USERNAME'),
+]
 
 
 # ========== 共通 ==========
@@ -29,6 +37,7 @@ def admin_redirect(request):
 
 # ========== Admin用（スーパーユーザー） ==========
 
+@rate_limit('custom_login', LOGIN_RATE_LIMITS, methods=('POST',))
 def custom_login(request):
     """管理者ログイン（メールアドレスまたはユーザー名で認証）"""
     if request.method == 'POST':
@@ -66,6 +75,7 @@ def custom_logout(request):
 
 # ========== 一般ユーザー用 ==========
 
+@rate_limit('user_login', LOGIN_RATE_LIMITS, methods=('POST',))
 def user_login(request):
     """一般ユーザーログイン（メールアドレスまたはユーザー名で認証）"""
     if request.method == 'POST':
@@ -77,7 +87,8 @@ def user_login(request):
         user = auth_backend.authenticate(request, username=username, password=password)
         
         if user is not None:
-            # セッションにユーザー情報を保存
+            # セッションIDを再発行し（セッション固定化対策）、ユーザー情報を保存
+            request.session.cycle_key()
             request.session['user_id'] = user.user_id
             request.session['user_username'] = user.username
             request.session['user_company_name'] = user.company.name
@@ -58,12 +58,8 @@ class UserAdmin(admin.ModelAdmin):
     is_deleted_display.short_description = '状態'
 
     def restore_items(self, request, queryset):
-        """選択したアイテムを復元"""
-        count = 0
-        for item in queryset:
-            if item.is_deleted:
-                item.restore()
-                count += 1
+        """選択したアイテムをまとめて復元"""
+        count = queryset.restore()
         self.message_user(request, f'{count}件のユーザーを復元しました。')
     restore_items.short_description = '選択したユーザーを復元'
 
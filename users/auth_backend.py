@@ -1,4 +1,5 @@
 from django.contrib.auth.backends import BaseBackend
+from terao_navi_web.auth_backend import find_user_by_email_or_username, run_dummy_password_check
 from users.models import User
 
 
@@ -7,19 +8,13 @@ class UserAuthBackend(BaseBackend):
     
     def authenticate(self, request, username=None, password=None, **kwargs):
         """ユーザー認証（メールアドレスまたはユーザー名で認証）"""
-        try:
-            # メールアドレスで検索
-            user = User.objects.get(email=username, is_active=True)
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            # メールアドレスで見つからない場合はユーザー名で検索
-            try:
-                user = User.objects.get(username=username, is_active=True)
-                if user.check_password(password):
-                    return user
-            except User.DoesNotExist:
-                return None
+        user = find_user_by_email_or_username(User.objects.filter(is_active=True), username)
+        if user is None:
+            run_dummy_password_check(password)
+            return None
+        # ハッシャーの反復回数が変わっている場合はログイン成功時に再ハッシュする
+        if user.check_password(password, setter=user.upgrade_password):
+            return user
         return None
     
     def get_user(self, user_id):
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from companies.models import Company
+from users.auth_backend import UserAuthBackend
+from users.models import Role, User
+
+
+# 計測用ユーザーの認証情報
+USERNAME = 'benchmark_login_user'
+EMAIL = 'benchmark_login_user@example.com'
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = '一般ユーザーのログイン（UserAuthBackend）の秒間認証回数とクエリ数を、成功・失敗のケースごとに計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='ケースごとの計測回数')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        backend = UserAuthBackend()
+
+        cases = (
+            ('メールアドレスで成功', EMAIL, PASSWORD, True),
+            ('ユーザー名で成功', USERNAME, PASSWORD, True),
+            ('パスワード誤り', USERNAME, 'wrong-password', False),
+            ('ユーザーなし', 'missing_user@example.com', PASSWORD, False),
+        )
+
+        # 計測用のデータは計測後にロールバックする
+        with transaction.atomic():
+            role, _ = Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+            company = Company.objects.create(name='ログイン計測用', address='-', tel='-')
+            user = User(company=company, role=role, username=USERNAME, email=EMAIL)
+            user.set_password(PASSWORD)
+            user.save()
+
+            # ダミーハッシュの生成を計測から除外
+            backend.authenticate(None, username='missing_user@example.com', password=PASSWORD)
+
+            for label, login, password, expected in cases:
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(iterations):
+                        if (backend.authenticate(None, username=login, password=password) is not None) != expected:
+                            self.stderr.write(self.style.ERROR(f'{label}: 想定と異なる認証結果です。'))
+                            transaction.set_rollback(True)
+                            return
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{label}: {iterations / elapsed:.1f} 回/秒 (平均 {elapsed / iterations * 1000:.2f}ms), '
+                    f'{len(queries) / iterations:.2f} クエリ/回'
+                )
+
+            transaction.set_rollback(True)
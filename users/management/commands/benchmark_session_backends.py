@@ -0,0 +1,60 @@
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# 計測するセッションエンジン
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'terao_navi_web.session_backend',
+    'django.contrib.sessions.backends.cache',
+)
+
+
+class Command(BaseCommand):
+    help = 'セッションエンジンごとに、1リクエストあたりのセッション処理時間とクエリ数を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000, help='計測するリクエスト数')
+        parser.add_argument('--write-every', type=int, default=10, help='セッションを更新するリクエストの間隔')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        write_every = options['write_every']
+
+        for engine in ENGINES:
+            SessionStore = import_module(engine).SessionStore
+
+            # ログイン直後のセッションを作成
+            session = SessionStore()
+            session.update({
+                'user_id': 1,
+                'user_username': 'benchmark',
+                'user_company_name': 'benchmark',
+                'is_user_authenticated': True,
+            })
+            session.create()
+            session_key = session.session_key
+
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for i in range(iterations):
+                        # SessionMiddlewareと同じく、リクエストごとにストアを生成して読み込む
+                        store = SessionStore(session_key)
+                        store.get('is_user_authenticated')
+                        if write_every and i % write_every == 0:
+                            store['last_seen'] = i
+                            store.save()
+                    elapsed = time.perf_counter() - started
+            finally:
+                SessionStore(session_key).delete()
+
+            self.stdout.write(
+                f'{engine}: 平均 {elapsed / iterations * 1000000:.1f}µs/リクエスト, '
+                f'{len(queries) / iterations:.2f} クエリ/リクエスト'
+            )
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+from terao_navi_web.hashers import CalibratedPBKDF2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        '実機でパスワードのハッシュ化時間を計測し、目標の所要時間に収まる反復回数（PASSWORD_HASH_ITERATIONS）を算出します'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100.0, help='1回のハッシュ化に許容する所要時間（ミリ秒）')
+        parser.add_argument('--samples', type=int, default=5, help='計測回数（中央値を使用）')
+        parser.add_argument('--min-iterations', type=int, default=100000, help='算出する反復回数の下限')
+        parser.add_argument('--round-to', type=int, default=10000, help='反復回数の丸め単位')
+
+    def _measure(self, hasher, iterations, samples):
+        """指定の反復回数でのハッシュ化時間（秒、中央値）"""
+        salt = hasher.salt()
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            hasher.encode('calibration-password', salt, iterations)
+            durations.append(time.perf_counter() - started)
+        return statistics.median(durations)
+
+    def handle(self, *args, **options):
+        if options['target_ms'] <= 0 or options['samples'] <= 0 or options['round_to'] <= 0:
+            raise CommandError('--target-ms、--samples、--round-toには正の値を指定してください。')
+
+        hasher = CalibratedPBKDF2PasswordHasher()
+        target = options['target_ms'] / 1000
+        samples = options['samples']
+
+        # 初回実行のオーバーヘッドを除外
+        hasher.encode('calibration-password', hasher.salt(), 1000)
+
+        # 基準の反復回数で1回あたりの時間を計測し、目標時間に合わせて比例計算する
+        baseline = PBKDF2PasswordHasher.iterations
+        per_iteration = self._measure(hasher, baseline, samples) / baseline
+        round_to = options['round_to']
+        iterations = max(int(target / per_iteration) // round_to * round_to, options['min_iterations'])
+
+        # 算出した反復回数で再計測して確認
+        elapsed = self._measure(hasher, iterations, samples)
+
+        current = hasher.iterations
+        current_elapsed = per_iteration * current
+        self.stdout.write(
+            f'現在の設定: {current}回 (約{current_elapsed * 1000:.1f}ms, 1コアあたり約{1 / current_elapsed:.1f}ログイン/秒)'
+        )
+        self.stdout.write(
+            f'推奨の設定: {iterations}回 ({elapsed * 1000:.1f}ms, 1コアあたり約{1 / elapsed:.1f}ログイン/秒)'
+        )
+        if iterations == options['min_iterations'] and elapsed > target:
+            self.stdout.write(self.style.WARNING(
+                f'下限の反復回数（{options["min_iterations"]}回）でも目標の{options["target_ms"]:.0f}msを超えています。'
+            ))
+        if iterations < baseline:
+            self.stdout.write(self.style.WARNING(
+                f'Django標準の反復回数（{baseline}回）より少ないため、パスワードの総当たりに対する耐性が下がります。'
+            ))
+
+        self.stdout.write(self.style.SUCCESS(f'PASSWORD_HASH_ITERATIONS={iterations}'))
+        if current != iterations:
+            self.stdout.write('環境変数を設定すると、既存のパスワードは各ユーザーの次回ログイン時に再ハッシュされます。')
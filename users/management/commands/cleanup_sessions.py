@@ -0,0 +1,32 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = '有効期限切れのセッションをdjango_sessionテーブルから少しずつ削除します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回のDELETEで削除する件数')
+        parser.add_argument('--sleep', type=float, default=0.0, help='DELETEごとの待機秒数（本番DBの負荷軽減用）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+
+        # 一度に削除すると長時間ロックするため、主キーを指定して件数ごとに削除する
+        while True:
+            session_keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size]
+            )
+            if not session_keys:
+                break
+            deleted += Session.objects.filter(session_key__in=session_keys).delete()[0]
+            self.stdout.write(f'  累計{deleted}件')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'有効期限切れのセッションを{deleted}件削除しました。'))
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DEFERRED
+
+from companies.models import Company
+from .models import Role, User
+
+
+# キャッシュキー（ユーザーごとのバージョンと、会社・ロール変更時に全体を無効化する世代）
+SNAPSHOT_KEY = 'current_user:v2:{user_id}:{version}:{generation}'
+VERSION_KEY = 'current_user_version:{user_id}'
+GENERATION_KEY = 'current_user_generation'
+
+
+# 共有キャッシュに保存しないフィールド（パスワードハッシュ等の秘密情報）
+SNAPSHOT_EXCLUDED_FIELDS = {'password'}
+
+
+def _model_values(instance):
+    """モデルのフィールド値を辞書で取得（キャッシュ保存用、秘密情報のフィールドは除く）"""
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in SNAPSHOT_EXCLUDED_FIELDS
+    }
+
+
+def _from_values(model, values):
+    """
+    キャッシュから復元したフィールド値でDB由来のインスタンスを生成
+
+    キャッシュにないフィールドは遅延読み込みとし、参照した時点でDBから取得する
+    （save()でも更新対象にならないため、空の値で上書きされない）。
+    """
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db('default', attnames, [values.get(attname, DEFERRED) for attname in attnames])
+
+
+def _snapshot_key(user_id):
+    versions = cache.get_many([VERSION_KEY.format(user_id=user_id), GENERATION_KEY])
+    return SNAPSHOT_KEY.format(
+        user_id=user_id,
+        version=versions.get(VERSION_KEY.format(user_id=user_id), 0),
+        generation=versions.get(GENERATION_KEY, 0),
+    )
+
+
+def load_current_user(user_id):
+    """
+    ユーザーを会社・ロールと合わせて取得
+
+    CURRENT_USER_CACHE_TIMEOUTが設定されている場合はキャッシュしたスナップショットを使う。
+    ユーザーの保存・削除時はユーザーごとのバージョン、会社・ロールの変更時は全体の世代を
+    更新するため、古いスナップショットは参照されなくなる。
+
+    Returns:
+        User or None: 有効なユーザー、存在しない・無効な場合None
+    """
+    timeout = settings.CURRENT_USER_CACHE_TIMEOUT
+    key = _snapshot_key(user_id) if timeout else None
+    if key is not None:
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            if not snapshot:
+                return None
+            user = _from_values(User, snapshot['user'])
+            user.company = _from_values(Company, snapshot['company'])
+            user.role = _from_values(Role, snapshot['role'])
+            return user
+
+    try:
+        user = User.objects.select_related('company', 'role').get(user_id=user_id, is_active=True)
+    except User.DoesNotExist:
+        user = None
+
+    if key is not None:
+        snapshot = {} if user is None else {
+            'user': _model_values(user),
+            'company': _model_values(user.company),
+            'role': _model_values(user.role),
+        }
+        cache.set(key, snapshot, timeout)
+    return user
+
+
+def invalidate_current_user(user_id=None):
+    """
+    キャッシュしたユーザーのスナップショットを無効化
+
+    Args:
+        user_id: 対象のユーザーID（省略時は全ユーザー）
+    """
+    if not settings.CURRENT_USER_CACHE_TIMEOUT:
+        return
+    key = GENERATION_KEY if user_id is None else VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # 未作成のキーは初期値で作成（期限なし）
+        cache.set(key, 1, None)
+
+
+def resolve_current_user(request):
+    """セッションから一般ユーザーを取得（未ログインの場合None）"""
+    if not request.session.get('is_user_authenticated'):
+        return None
+    user_id = request.session.get('user_id')
+    return load_current_user(user_id) if user_id else None
+
+
+def get_current_user(request):
+    """
+    リクエストの一般ユーザーを取得
+
+    CurrentUserMiddlewareで解決済みのユーザーを返す（ミドルウェアを通らない場合はここで取得）。
+    """
+    if not hasattr(request, 'current_user'):
+        request.current_user = resolve_current_user(request)
+    return request.current_user
+
+
+class CurrentUserMiddleware:
+    """
+    セッションの一般ユーザーをリクエストごとに1回だけ解決し、request.current_userに設定するミドルウェア
+
+    会社・ロールも同時に取得するため、ビューでcurrent_user.companyを参照しても追加のクエリは発生しない。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.current_user = resolve_current_user(request)
+        return self.get_response(request)
@@ -1,7 +1,7 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
-from companies.models import Company, SoftDeleteManager
+from companies.models import Company, SoftDeleteManager, SoftDeleteQuerySet
 
 
 class Role(models.Model):
@@ -61,14 +61,20 @@ class User(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新日時')
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    # 一覧画面の検索対象（terao_navi_web.search、FULLTEXTインデックスはensure_fulltext_indexesで作成）
+    search_fields = ('username', 'email', 'first_name', 'last_name')
 
     class Meta:
         db_table = 'users'
         verbose_name = 'ユーザー'
         verbose_name_plural = 'ユーザー'
         indexes = [
-            models.Index(fields=['company']),
+            # 会社ごとの一覧（論理削除を除外し、作成日時の降順でキーセットページネーション）
+            models.Index(fields=['company', 'is_deleted', 'created_at', 'user_id']),
+            # 全社のユーザー一覧（管理画面）
+            models.Index(fields=['is_deleted', 'created_at', 'user_id']),
             models.Index(fields=['username']),
             models.Index(fields=['email']),
             models.Index(fields=['role']),
@@ -81,9 +87,21 @@ class User(models.Model):
         """パスワードをハッシュ化して保存"""
         self.password = make_password(raw_password)
 
-    def check_password(self, raw_password):
-        """パスワードを検証"""
-        return check_password(raw_password, self.password)
+    def check_password(self, raw_password, setter=None):
+        """
+        パスワードを検証
+
+        Args:
+            raw_password: 入力されたパスワード
+            setter: ハッシュの再作成が必要な場合（反復回数・アルゴリズムの変更時）に
+                    平文のパスワードを受け取って呼ばれる関数
+        """
+        return check_password(raw_password, self.password, setter)
+
+    def upgrade_password(self, raw_password):
+        """現在のハッシャー設定でパスワードを再ハッシュしてパスワードのみ保存"""
+        self.set_password(raw_password)
+        self.save(update_fields=['password', 'updated_at'])
     
     def has_full_access(self):
         """全権限を持っているか"""
@@ -106,9 +124,11 @@ class User(models.Model):
     
     def delete(self, using=None, keep_parents=False):
         """論理削除"""
+        now = timezone.now()
+        User.all_objects.filter(pk=self.pk).soft_delete(now)
         self.is_deleted = True
-        self.deleted_at = timezone.now()
-        self.save()
+        self.deleted_at = now
+        self.updated_at = now
     
     def hard_delete(self):
         """物理削除"""
@@ -116,6 +136,8 @@ class User(models.Model):
     
     def restore(self):
         """削除を取り消す"""
+        now = timezone.now()
+        User.all_objects.filter(pk=self.pk).restore(now)
         self.is_deleted = False
         self.deleted_at = None
-        self.save()
+        self.updated_at = now
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from companies.models import Company, soft_delete_changed
+from .middleware import invalidate_current_user
+from .models import Role, User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """ユーザーの保存・削除時にキャッシュしたスナップショットを無効化（コミット後）"""
+    transaction.on_commit(lambda: invalidate_current_user(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Company)
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_all_user_snapshots(sender, **kwargs):
+    """会社・ロールの変更時は全ユーザーのスナップショットを無効化（コミット後）"""
+    transaction.on_commit(invalidate_current_user)
+
+
+@receiver(soft_delete_changed, sender=User)
+@receiver(soft_delete_changed, sender=Company)
+def invalidate_snapshots_on_soft_delete(sender, **kwargs):
+    """まとめて論理削除・復元した場合は全ユーザーのスナップショットを無効化（コミット後）"""
+    transaction.on_commit(invalidate_current_user)
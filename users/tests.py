@@ -1,3 +1,43 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from companies.models import Company
+from .middleware import _snapshot_key, load_current_user
+from .models import Role, User
+
+
+@override_settings(CURRENT_USER_CACHE_TIMEOUT=60)
+class CurrentUserSnapshotTests(TestCase):
+    """ログイン中のユーザーのキャッシュのテスト"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Role.objects.get_or_create(role_id=Role.READ_ONLY, defaults={'name': '閲覧権限'})
+        company = Company.objects.create(name='会社', address='住所', tel='000')
+        cls.user = User.objects.create(company=company, username='user', email='user@example.com')
+        cls.user.set_password('password')
+        cls.user.save()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_password_hash_is_not_cached(self):
+        """パスワードハッシュは共有キャッシュに保存せず、参照時にDBから取得する"""
+        load_current_user(self.user.user_id)
+        snapshot = cache.get(_snapshot_key(self.user.user_id))
+        self.assertNotIn('password', snapshot['user'])
+
+        with self.assertNumQueries(0):
+            user = load_current_user(self.user.user_id)
+        self.assertIn('password', user.get_deferred_fields())
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('password'))
+
+    def test_saving_cached_user_keeps_password(self):
+        """キャッシュから復元したユーザーを保存してもパスワードを上書きしない"""
+        load_current_user(self.user.user_id)
+        user = load_current_user(self.user.user_id)
+        user.first_name = '太郎'
+        user.save()
+
+        self.assertTrue(User.objects.get(user_id=self.user.user_id).check_password('password'))
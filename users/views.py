@@ -1,10 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Q
 from companies.models import Company
 from .models import User, Role
 from .forms import UserForm
+from .middleware import get_current_user
+from terao_navi_web.search import paginate_search
 
 
 def is_superuser(user):
@@ -22,17 +23,6 @@ def require_user_authentication(view_func):
     return wrapper
 
 
-def get_current_user(request):
-    """セッションから現在のユーザーを取得"""
-    user_id = request.session.get('user_id')
-    if user_id:
-        try:
-            return User.objects.select_related('company', 'role').get(user_id=user_id)
-        except User.DoesNotExist:
-            return None
-    return None
-
-
 # ========== Admin用User管理Views ==========
 
 @user_passes_test(is_superuser, login_url='/login/')
@@ -43,21 +33,15 @@ def user_list(request):
     
     users = User.objects.select_related('company').all()
     
-    if query:
-        users = users.filter(
-            Q(username__icontains=query) |
-            Q(email__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )
-    
     if company_filter:
         users = users.filter(company_id=company_filter)
     
     companies = Company.objects.all()
     
+    page = paginate_search(request, users, query)
     context = {
-        'users': users.order_by('-created_at'),
+        'users': page.object_list,
+        'page': page,
         'companies': companies,
         'query': query,
         'company_filter': company_filter,
@@ -144,16 +128,10 @@ def general_user_list(request):
     # 自分自身を除外
     users = User.objects.filter(company_id=current_user.company_id).exclude(user_id=current_user.user_id).select_related('company', 'role')
     
-    if query:
-        users = users.filter(
-            Q(username__icontains=query) |
-            Q(email__icontains=query) |
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )
-    
+    page = paginate_search(request, users, query)
     context = {
-        'users': users.order_by('-created_at'),
+        'users': page.object_list,
+        'page': page,
         'query': query,
         'current_user': current_user,
         'can_create': current_user.role_id in [Role.FULL_ACCESS, Role.LIMITED_ACCESS],